@@ -1,5 +1,27 @@
 from django.contrib import admin
-from .models import Property, PropertyImage, PropertyInquiry, FavoriteProperty
+from django.utils import timezone
+from .exports import INQUIRY_EXPORT_FIELDS, PROPERTY_EXPORT_FIELDS, export_response
+from .models import BackgroundJob, Property, PropertyImage, PropertyInquiry, FavoriteProperty
+
+
+@admin.action(description='Export selected properties as CSV')
+def export_properties_csv(modeladmin, request, queryset):
+    return export_response(queryset.order_by('id'), PROPERTY_EXPORT_FIELDS, 'csv', 'properties')
+
+
+@admin.action(description='Export selected properties as JSON lines')
+def export_properties_jsonl(modeladmin, request, queryset):
+    return export_response(queryset.order_by('id'), PROPERTY_EXPORT_FIELDS, 'jsonl', 'properties')
+
+
+@admin.action(description='Export selected inquiries as CSV')
+def export_inquiries_csv(modeladmin, request, queryset):
+    return export_response(queryset.order_by('id'), INQUIRY_EXPORT_FIELDS, 'csv', 'inquiries')
+
+
+@admin.action(description='Export selected inquiries as JSON lines')
+def export_inquiries_jsonl(modeladmin, request, queryset):
+    return export_response(queryset.order_by('id'), INQUIRY_EXPORT_FIELDS, 'jsonl', 'inquiries')
 
 
 @admin.register(Property)
@@ -34,6 +56,7 @@ class PropertyAdmin(admin.ModelAdmin):
         }),
     )
     prepopulated_fields = {'slug': ('title',)}
+    actions = [export_properties_csv, export_properties_jsonl]
 
 
 @admin.register(PropertyImage)
@@ -48,6 +71,7 @@ class PropertyImageAdmin(admin.ModelAdmin):
 class PropertyInquiryAdmin(admin.ModelAdmin):
     list_display = ['property', 'sender', 'inquiry_type', 'status', 'created_at']
     list_filter = ['status', 'inquiry_type', 'created_at']
+    actions = [export_inquiries_csv, export_inquiries_jsonl]
     search_fields = ['property__title', 'sender__username', 'name', 'email']
     readonly_fields = ['created_at', 'updated_at']
     fieldsets = (
@@ -73,3 +97,16 @@ class FavoritePropertyAdmin(admin.ModelAdmin):
     list_filter = ['added_at']
     search_fields = ['user__username', 'property__title']
     readonly_fields = ['added_at']
+
+
+@admin.action(description='Retry selected jobs now')
+def retry_jobs(modeladmin, request, queryset):
+    queryset.update(status='pending', run_after=timezone.now(), locked_at=None, locked_by='')
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'property', 'status', 'attempts', 'run_after', 'created_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['locked_at', 'locked_by', 'error', 'created_at']
+    actions = [retry_jobs]
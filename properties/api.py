@@ -0,0 +1,163 @@
+"""
+Read-only JSON API (``/api/v1/``) for listings, their images and facets.
+
+Rows are read with ``.values()`` so no model instances are built, only the
+columns behind the requested ``?fields=`` are selected, and responses are
+encoded with orjson when it is installed (compact ``json`` otherwise).
+Filtering, keyset pagination, counts and facets are shared with the HTML
+views.
+"""
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from .counts import listing_count
+from .facets import listing_facets
+from .filters import filter_properties, ordering_keys, record_filters
+from .models import Property, PropertyImage
+from .pagination import KeysetPaginator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LISTING_FIELDS = (
+    'id', 'slug', 'title', 'listing_type', 'property_type', 'price', 'area', 'bedrooms', 'bathrooms',
+    'city', 'state', 'latitude', 'longitude', 'is_furnished', 'has_parking', 'photo_count',
+    'created_at', 'updated_at', 'image',
+)
+DETAIL_FIELDS = LISTING_FIELDS + (
+    'description', 'location', 'postal_code', 'condition',
+    'has_balcony', 'has_garden', 'has_pool', 'has_gym', 'is_featured',
+)
+# Fields built after the query rather than selected as columns.
+COMPUTED_FIELDS = ('image',)
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_encoder = DjangoJSONEncoder()
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+def api_response(data, status=200):
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+
+def api_error(message, status):
+    return api_response({'error': message}, status=status)
+
+
+def parse_fields(params, allowed):
+    """The requested ``?fields=`` as a tuple; raises ValueError on unknown names."""
+    requested = [name.strip() for name in params.get('fields', '').split(',') if name.strip()]
+    if not requested:
+        return allowed
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValueError('Unknown fields: %s' % ', '.join(unknown))
+    return tuple(dict.fromkeys(requested))
+
+
+def _cover_images(property_ids):
+    """Map property id -> URL of its cover image, in one query."""
+    covers = {}
+    images = (
+        PropertyImage.objects.filter(property_id__in=property_ids)
+        .order_by('property_id', '-is_primary', 'uploaded_at')
+        .values_list('property_id', 'image')
+    )
+    storage = PropertyImage._meta.get_field('image').storage
+    for property_id, name in images:
+        if property_id not in covers:
+            covers[property_id] = storage.url(name)
+    return covers
+
+
+def _rows(rows, fields):
+    if 'image' in fields:
+        covers = _cover_images([row['id'] for row in rows])
+        for row in rows:
+            row['image'] = covers.get(row['id'])
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+def _columns(fields, *required):
+    return list(dict.fromkeys(
+        [field for field in fields if field not in COMPUTED_FIELDS] + list(required)
+    ))
+
+
+@require_GET
+def listings(request):
+    try:
+        fields = parse_fields(request.GET, LISTING_FIELDS)
+        per_page = min(max(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError as exc:
+        return api_error(str(exc), 400)
+
+    properties = filter_properties(Property.objects.active(), request.GET)
+    record_filters(request.GET)
+    keys = ordering_keys(properties)
+    paginator = KeysetPaginator(properties.values(*_columns(fields, 'id', *keys)), per_page, keys=keys)
+    page = paginator.get_page(request.GET.get('cursor'))
+    count = listing_count(filter_properties(Property.objects.active(), request.GET, rank=False), request.GET)
+
+    return api_response({
+        'count': count.value,
+        'count_is_exact': not (count.capped or count.approximate),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+        'results': _rows(page.object_list, fields),
+    })
+
+
+@require_GET
+def listing_detail(request, slug):
+    try:
+        fields = parse_fields(request.GET, DETAIL_FIELDS)
+    except ValueError as exc:
+        return api_error(str(exc), 400)
+
+    rows = list(Property.objects.active().filter(slug=slug).values(*_columns(fields, 'id')))
+    if not rows:
+        return api_error('Not found', 404)
+    return api_response(_rows(rows, fields)[0])
+
+
+@require_GET
+def listing_images(request, slug):
+    property_id = Property.objects.active().filter(slug=slug).values_list('id', flat=True).first()
+    if property_id is None:
+        return api_error('Not found', 404)
+
+    storage = PropertyImage._meta.get_field('image').storage
+    images = PropertyImage.objects.filter(property_id=property_id).values(
+        'id', 'image', 'is_primary', 'uploaded_at', 'variants'
+    )
+    return api_response({'results': [
+        {
+            'id': image['id'],
+            'url': storage.url(image['image']),
+            'is_primary': image['is_primary'],
+            'uploaded_at': image['uploaded_at'],
+            'variants': {
+                name: {width: storage.url(variant) for width, variant in widths.items()}
+                for name, widths in (image['variants'] or {}).items()
+            },
+        }
+        for image in images
+    ]})
+
+
+@require_GET
+def facets(request):
+    return api_response(listing_facets(Property.objects.active(), request.GET))
@@ -5,3 +5,6 @@ class PropertiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'properties'
     verbose_name = 'Properties & Listings'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Lower
+
+UserModel = get_user_model()
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    Authenticate with a username or an email address, case-insensitively.
+
+    The account is resolved with one query over the LOWER(username) and
+    LOWER(email) expression indexes (migration 0009), and the password is
+    hashed exactly once whether or not the account exists. A login that
+    matches several accounts equally well (an email shared by two accounts,
+    or usernames differing only in case) resolves to none of them; those
+    users sign in with their exact username.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = self.find_user(username.strip())
+        if user is None:
+            # Run the hasher anyway so response time doesn't reveal whether
+            # the account exists.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def find_user(self, login):
+        value = login.lower()
+        matches = (
+            UserModel._default_manager
+            .alias(username_lower=Lower('username'), email_lower=Lower('email'))
+            .filter(Q(username_lower=value) | Q(email_lower=value))
+            # An exact username wins over a case-folded one, which wins over an email.
+            .annotate(match=Case(
+                When(username=login, then=Value(0)),
+                When(username_lower=value, then=Value(1)),
+                default=Value(2),
+            ))
+            .order_by('match', 'pk')
+        )
+        best = list(matches[:2])
+        if not best:
+            return None
+        if len(best) > 1 and best[0].match == best[1].match:
+            return None
+        return best[0]
@@ -0,0 +1,45 @@
+"""
+Cache helpers for listing data.
+
+Cached listing data is keyed by a global "listings version" that signals bump
+whenever a listing changes, so stale entries are simply never read again and
+age out of the cache on their own.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import record_cache
+
+LISTINGS_VERSION_KEY = 'properties:listings-version'
+
+
+def listings_version():
+    version = cache.get(LISTINGS_VERSION_KEY)
+    if version is None:
+        cache.add(LISTINGS_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(LISTINGS_VERSION_KEY, 0)
+    return version
+
+
+def bump_listings_version():
+    # A fresh timestamp rather than cache.incr(): on backends without an
+    # atomic incr (file, database) incr is a get+set that re-stores the key
+    # with the default timeout and can lose concurrent bumps. A version that
+    # expires or is evicted also restarts at a value never used before.
+    cache.set(LISTINGS_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def cached_listings(name, build, timeout=None):
+    """Return ``build()`` cached under ``name`` until listings change."""
+    key = 'properties:%s:%s' % (name, listings_version())
+    listings = cache.get(key)
+    record_cache(name, listings is not None)
+    if listings is None:
+        listings = build()
+        if timeout is None:
+            timeout = getattr(settings, 'HOME_SECTIONS_CACHE_TIMEOUT', 600)
+        cache.set(key, listings, timeout)
+    return listings
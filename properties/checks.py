@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends every process on every host reaches. Files and process memory are
+# private to one host or one process.
+SHARED_CACHES = (
+    'django.core.cache.backends.db.DatabaseCache',
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+METRICS_MIDDLEWARE = 'properties.middleware.MetricsMiddleware'
+TIMING_MIDDLEWARE = 'properties.middleware.RequestTimingMiddleware'
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Cached counts, facets and home sections are invalidated by bumping the
+    listings version in the default cache, which only reaches other web and
+    worker processes if they share that cache.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if settings.DEBUG or backend in SHARED_CACHES:
+        return []
+    return [Warning(
+        f'The default cache ({backend}) is not shared by every process and host, so listing '
+        'invalidations reach only the process that saved the listing and the others serve '
+        'stale counts and listings.',
+        hint='Use DatabaseCache, Redis or Memcached for the default cache.',
+        id='properties.W001',
+    )]
+
+@register()
+def check_metrics_middleware(app_configs, **kwargs):
+    """MetricsMiddleware reads query counts measured by RequestTimingMiddleware."""
+    middleware = list(settings.MIDDLEWARE)
+    if not getattr(settings, 'METRICS_ENABLED', True) or METRICS_MIDDLEWARE not in middleware:
+        return []
+    if TIMING_MIDDLEWARE in middleware[middleware.index(METRICS_MIDDLEWARE) + 1:]:
+        return []
+    return [Warning(
+        'MetricsMiddleware has no RequestTimingMiddleware below it, so /metrics reports zero queries.',
+        hint=f"Add '{TIMING_MIDDLEWARE}' to MIDDLEWARE after '{METRICS_MIDDLEWARE}'.",
+        id='properties.W002',
+    )]
@@ -0,0 +1,95 @@
+"""
+Validators for conditional GETs of the listing and detail pages.
+
+Each validator is one small query, so a matching ``If-None-Match`` or
+``If-Modified-Since`` is answered with 304 before the view runs. ETags mix
+database state (timestamps, window ids, favorite flags) with the viewer and
+the listings cache version: the version covers changes elsewhere that still
+show up on the page (counts, facets, similar listings), the database part
+keeps validators correct if the cache is cleared. Pages carrying flash
+messages get no validator so the messages are always rendered, and neither
+do search results: finding their window means ranking the matches, which is
+most of the page's cost.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Exists, Max, OuterRef
+
+from .caching import listings_version
+from .filters import filter_properties, ordering_keys
+from .models import FavoriteProperty, Property
+from .pagination import KeysetPaginator
+
+
+def _etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _has_messages(request):
+    return len(messages.get_messages(request)) > 0
+
+
+def _favorited(request):
+    return Exists(FavoriteProperty.objects.filter(user=request.user, property=OuterRef('pk')))
+
+
+def _viewer(request):
+    return request.user.pk if request.user.is_authenticated else 'anonymous'
+
+
+def _detail_state(request, slug):
+    # Memoized: condition() asks for the ETag and Last-Modified separately.
+    if not hasattr(request, '_detail_state'):
+        properties = Property.objects.filter(slug=slug).annotate(last_image=Max('images__uploaded_at'))
+        fields = ['updated_at', 'last_image']
+        if request.user.is_authenticated:
+            properties = properties.annotate(is_favorite=_favorited(request))
+            fields.append('is_favorite')
+        request._detail_state = properties.values(*fields).first()
+    return request._detail_state
+
+
+def detail_etag(request, slug):
+    state = _detail_state(request, slug)
+    if state is None or _has_messages(request):
+        return None
+    return _etag(
+        'detail', slug, state['updated_at'].isoformat(), state['last_image'],
+        state.get('is_favorite'), _viewer(request), listings_version(),
+    )
+
+
+def detail_last_modified(request, slug):
+    # Favorites can be removed without leaving a timestamp behind, so
+    # signed-in viewers are validated by ETag alone.
+    state = _detail_state(request, slug)
+    if state is None or request.user.is_authenticated or _has_messages(request):
+        return None
+    return max(timestamp for timestamp in (state['updated_at'], state['last_image']) if timestamp)
+
+
+def listing_etag(request):
+    """Validator for one ``property_list`` page: its window of rows."""
+    # Which rows make up a page of search results depends on their relevance,
+    # so validating one would cost as much as ranking the page itself.
+    if _has_messages(request) or request.GET.get('search', '').strip():
+        return None
+    properties = filter_properties(Property.objects.active(), request.GET)
+    keys = ordering_keys(properties)
+    fields = ['id', 'updated_at', *keys]
+    if request.user.is_authenticated:
+        properties = properties.annotate(is_favorite=_favorited(request))
+        fields.append('is_favorite')
+    page = KeysetPaginator(
+        properties.values(*fields), settings.PROPERTIES_PER_PAGE, keys=keys,
+    ).get_page(request.GET.get('cursor'))
+    rows = page.object_list
+    return _etag(
+        'list', request.GET.urlencode(), _viewer(request), listings_version(),
+        max((row['updated_at'] for row in rows), default=''),
+        ','.join(str(row['id']) for row in rows),
+        ','.join(str(row['id']) for row in rows if row.get('is_favorite')),
+    )
@@ -0,0 +1,66 @@
+"""
+Denormalized per-listing counters.
+
+``Property.photo_count``, ``favorite_count`` and ``pending_inquiry_count``
+are adjusted with single ``UPDATE ... SET n = n + 1`` statements from the
+signals in ``signals.py``, so readers never COUNT the related tables.
+Anything that bypasses signals (queryset ``update()``, raw SQL, fixtures)
+can leave them drifting; ``reconcile`` recomputes them in bulk and only
+rewrites the rows that are wrong.
+"""
+
+from django.apps import apps as global_apps
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+# counter field -> (related model, filter on that model)
+COUNTERS = {
+    'photo_count': ('PropertyImage', Q()),
+    'favorite_count': ('FavoriteProperty', Q()),
+    'pending_inquiry_count': ('PropertyInquiry', Q(status='pending')),
+}
+RECONCILE_BATCH_SIZE = 500
+
+
+def _step(field, delta):
+    return F(field) + delta if delta > 0 else Greatest(F(field) + delta, Value(0))
+
+
+def adjust(property_id, field, delta, **changes):
+    """Atomically move one listing's counter by ``delta``, never below zero."""
+    from .models import Property
+
+    Property.objects.filter(pk=property_id).update(**{field: _step(field, delta)}, **changes)
+
+
+def adjust_many(properties, field, delta):
+    """``adjust`` for every listing in the ``properties`` queryset, in one UPDATE."""
+    return properties.update(**{field: _step(field, delta)})
+
+
+def actual_count(field, apps=global_apps):
+    model_name, condition = COUNTERS[field]
+    related = apps.get_model('properties', model_name)
+    rows = (
+        related.objects.filter(condition, property=OuterRef('pk'))
+        .order_by().values('property').annotate(total=Count('id')).values('total')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def reconcile(apps=global_apps, using='default'):
+    """Recompute drifted counters; returns the number of listings repaired."""
+    Property = apps.get_model('properties', 'Property')
+    actual = {f'actual_{field}': actual_count(field, apps) for field in COUNTERS}
+    drifted = Q()
+    for field in COUNTERS:
+        drifted |= ~Q(**{field: F(f'actual_{field}')})
+    ids = list(
+        Property.objects.using(using).annotate(**actual).filter(drifted)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    for start in range(0, len(ids), RECONCILE_BATCH_SIZE):
+        Property.objects.using(using).filter(pk__in=ids[start:start + RECONCILE_BATCH_SIZE]).update(
+            **{field: actual_count(field, apps) for field in COUNTERS}
+        )
+    return len(ids)
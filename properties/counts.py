@@ -0,0 +1,119 @@
+"""
+Result totals for listing searches.
+
+One count per request at most: totals are cached per normalized filter set
+and listings version, capped so a broad search never counts past
+``PROPERTY_COUNT_CAP`` rows, and, for large unfiltered sets, optionally
+estimated from database statistics instead of counted.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .caching import listings_version
+from .metrics import record_cache
+
+FILTER_PARAMS = (
+    'search', 'listing_type', 'property_type', 'city', 'min_price', 'max_price',
+    'bedrooms', 'bathrooms', 'is_furnished', 'has_parking',
+    'lat', 'lng', 'radius', 'bbox',
+)
+
+
+class ResultCount:
+    def __init__(self, value, capped=False, approximate=False):
+        self.value = value
+        self.capped = capped
+        self.approximate = approximate
+
+    def __int__(self):
+        return self.value
+
+    def __str__(self):
+        if self.capped:
+            return f'{self.value:,}+'
+        if self.approximate:
+            return f'~{self.value:,}'
+        return f'{self.value:,}'
+
+
+def normalize_filters(params):
+    """Return the applied filters as a canonical, order-independent dict."""
+    filters = {}
+    for name in FILTER_PARAMS:
+        value = params.get(name, '')
+        value = ' '.join(str(value).lower().split())
+        if value:
+            filters[name] = value
+    return filters
+
+
+def filters_key(filters):
+    payload = json.dumps(filters, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def listing_count(queryset, params):
+    filters = normalize_filters(params)
+    key = 'properties:count:%s:%s' % (listings_version(), filters_key(filters))
+    cached = cache.get(key)
+    record_cache('counts', cached is not None)
+    if cached is not None:
+        return ResultCount(*cached)
+
+    result = None
+    if not filters and getattr(settings, 'PROPERTY_APPROXIMATE_COUNTS', False):
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= settings.PROPERTY_APPROXIMATE_COUNT_THRESHOLD:
+            result = ResultCount(estimate, approximate=True)
+    if result is None:
+        result = exact_count(queryset, getattr(settings, 'PROPERTY_COUNT_CAP', None))
+
+    timeout = getattr(settings, 'PROPERTY_COUNT_CACHE_TIMEOUT', 300)
+    cache.set(key, (result.value, result.capped, result.approximate), timeout)
+    return result
+
+
+def exact_count(queryset, cap=None):
+    queryset = queryset.order_by()
+    if not cap:
+        return ResultCount(queryset.count())
+    # COUNT over a LIMITed subquery stops scanning after cap + 1 rows.
+    count = queryset[:cap + 1].count()
+    if count > cap:
+        return ResultCount(cap, capped=True)
+    return ResultCount(count)
+
+
+def estimate_count(queryset):
+    """Row estimate from planner statistics, or None when unavailable."""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    if connection.vendor == 'sqlite':
+        # Populated by ANALYZE; the first number of each stat is the row count.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return int(row[0].split()[0])
+    return None
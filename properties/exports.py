@@ -0,0 +1,82 @@
+"""
+Streaming CSV/JSONL exports.
+
+Rows are read with ``.values_list().iterator()`` and written out in ~64 KB
+chunks through ``StreamingHttpResponse``, so memory stays flat and the
+header goes out before the first database chunk is read.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+PROPERTY_EXPORT_FIELDS = (
+    'id', 'slug', 'title', 'listing_type', 'property_type', 'condition', 'price', 'area',
+    'bedrooms', 'bathrooms', 'location', 'city', 'state', 'postal_code', 'latitude', 'longitude',
+    'is_furnished', 'has_parking', 'has_balcony', 'has_garden', 'has_pool', 'has_gym',
+    'is_active', 'is_featured', 'contact_name', 'contact_phone', 'contact_email',
+    'owner__username', 'created_at', 'updated_at',
+)
+
+INQUIRY_EXPORT_FIELDS = (
+    'id', 'property__slug', 'property__title', 'sender__username', 'name', 'email', 'phone',
+    'inquiry_type', 'status', 'message', 'created_at', 'updated_at',
+)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back."""
+
+    def write(self, value):
+        return value
+
+
+def _lines(queryset, fields, export_format):
+    rows = queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+    if export_format == 'jsonl':
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        for row in rows:
+            yield encoder.encode(dict(zip(fields, row))) + '\n'
+    else:
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+
+
+def stream_export(queryset, fields, export_format):
+    buffer = []
+    size = 0
+    lines = _lines(queryset, fields, export_format)
+    # Send the CSV header on its own so clients see bytes immediately.
+    if export_format == 'csv':
+        yield next(lines)
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def export_response(queryset, fields, export_format, filename):
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+    response = StreamingHttpResponse(
+        stream_export(queryset, fields, export_format),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,153 @@
+"""
+Facet counts for the listing filters.
+
+All facets come from a single grouped query: the listings matching every
+non-facet filter (search, bathrooms, amenities, location) are grouped by
+listing type, property type, city and bedroom bucket, with per-price-band
+conditional counts alongside. Each facet is then summed in Python over the
+groups that satisfy the *other* facet filters, so a facet never narrows
+itself. Results are cached per normalized filter set and listings version.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, F, Q, Value, When
+
+from .caching import listings_version
+from .counts import filters_key, normalize_filters
+from .filters import filter_properties
+from .metrics import record_cache
+from .models import Property
+
+FACET_PARAMS = ('listing_type', 'property_type', 'city', 'bedrooms', 'min_price', 'max_price')
+BEDROOM_BUCKETS = 5
+CITY_LIMIT = 10
+DEFAULT_PRICE_BANDS = (0, 10_000, 50_000, 250_000, 1_000_000, 5_000_000, 20_000_000)
+PRICE_STEP = Decimal('0.01')
+
+
+def price_bands():
+    edges = tuple(getattr(settings, 'PROPERTY_PRICE_BANDS', DEFAULT_PRICE_BANDS))
+    return list(zip(edges, edges[1:] + (None,)))
+
+
+def _number(params, name, kind):
+    try:
+        value = kind(params.get(name)) if params.get(name) else None
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    if isinstance(value, Decimal) and not value.is_finite():
+        return None
+    return value
+
+
+def _facet_filters(params):
+    return {
+        'listing_type': params.get('listing_type', ''),
+        'property_type': params.get('property_type', ''),
+        'city': ' '.join(params.get('city', '').lower().split()),
+        'bedrooms': _number(params, 'bedrooms', int),
+        'min_price': _number(params, 'min_price', Decimal),
+        'max_price': _number(params, 'max_price', Decimal),
+    }
+
+
+def _matches(row, selected, skip):
+    if skip != 'listing_type' and selected['listing_type'] and row['listing_type'] != selected['listing_type']:
+        return False
+    if skip != 'property_type' and selected['property_type'] and row['property_type'] != selected['property_type']:
+        return False
+    if skip != 'city' and selected['city'] and selected['city'] not in (row['city'] or '').lower():
+        return False
+    if skip != 'bedrooms' and selected['bedrooms'] is not None:
+        if row['bedroom_bucket'] is None or row['bedroom_bucket'] < selected['bedrooms']:
+            return False
+    return True
+
+
+def _choice_facet(rows, selected, name, choices):
+    counts = dict.fromkeys((value for value, _ in choices), 0)
+    for row in rows:
+        if row[name] in counts and _matches(row, selected, name):
+            counts[row[name]] += row['matching']
+    return [
+        {'value': value, 'label': label, 'count': counts[value], 'selected': value == selected[name]}
+        for value, label in choices
+    ]
+
+
+def compute_facets(queryset, params):
+    selected = _facet_filters(params)
+    base = filter_properties(queryset, {
+        name: value for name, value in params.items() if name not in FACET_PARAMS
+    }, rank=False).order_by()
+
+    price = Q()
+    if selected['min_price'] is not None:
+        price &= Q(price__gte=selected['min_price'])
+    if selected['max_price'] is not None:
+        price &= Q(price__lte=selected['max_price'])
+    bands = price_bands()
+    band_counts = {
+        f'band_{index}': Count('id', filter=Q(price__gte=low, **({'price__lt': high} if high else {})))
+        for index, (low, high) in enumerate(bands)
+    }
+    # Bedrooms are filtered with >=, so the top bucket must reach the filter.
+    cap = max(BEDROOM_BUCKETS, selected['bedrooms'] or 0)
+    bucket = Case(When(bedrooms__gte=cap, then=Value(cap)), default=F('bedrooms'))
+    rows = list(
+        base.values('listing_type', 'property_type', 'city', bedroom_bucket=bucket)
+        .annotate(matching=Count('id', filter=price) if price else Count('id'), **band_counts)
+    )
+
+    cities = {}
+    bedrooms = dict.fromkeys(range(1, BEDROOM_BUCKETS + 1), 0)
+    prices = [0] * len(bands)
+    for row in rows:
+        if row['city'] and _matches(row, selected, 'city'):
+            cities[row['city']] = cities.get(row['city'], 0) + row['matching']
+        if row['bedroom_bucket'] is not None and _matches(row, selected, 'bedrooms'):
+            for minimum in bedrooms:
+                if row['bedroom_bucket'] >= minimum:
+                    bedrooms[minimum] += row['matching']
+        if _matches(row, selected, 'price'):
+            for index in range(len(bands)):
+                prices[index] += row[f'band_{index}']
+
+    top_cities = sorted(cities.items(), key=lambda item: (-item[1], item[0]))[:CITY_LIMIT]
+    price_facet = []
+    for (low, high), count in zip(bands, prices):
+        maximum = str(Decimal(high) - PRICE_STEP) if high else None
+        price_facet.append({
+            'label': f'{low:,}+' if high is None else f'{low:,} - {high:,}',
+            'min_price': str(low),
+            'max_price': maximum,
+            'count': count,
+            'selected': selected['min_price'] == Decimal(low)
+                        and selected['max_price'] == (Decimal(maximum) if maximum else None),
+        })
+    return {
+        'listing_type': _choice_facet(rows, selected, 'listing_type', Property.LISTING_TYPE_CHOICES),
+        'property_type': _choice_facet(rows, selected, 'property_type', Property.PROPERTY_TYPE_CHOICES),
+        'city': [
+            {'value': city, 'label': city, 'count': count, 'selected': city.lower() == selected['city']}
+            for city, count in top_cities
+        ],
+        'bedrooms': [
+            {'value': minimum, 'label': f'{minimum}+', 'count': count, 'selected': minimum == selected['bedrooms']}
+            for minimum, count in bedrooms.items()
+        ],
+        'price': price_facet,
+    }
+
+
+def listing_facets(queryset, params):
+    key = 'properties:facets:%s:%s' % (listings_version(), filters_key(normalize_filters(params)))
+    facets = cache.get(key)
+    record_cache('facets', facets is not None)
+    if facets is None:
+        facets = compute_facets(queryset, params)
+        cache.set(key, facets, getattr(settings, 'PROPERTY_COUNT_CACHE_TIMEOUT', 300))
+    return facets
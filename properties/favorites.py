@@ -0,0 +1,105 @@
+"""
+Favorite lookups and writes that stay cheap for users with many favorites.
+
+Lookups are scoped to the listings on screen and hit the (user, property)
+unique index. Writes go straight to SQL with no read first. Those writes
+skip model signals, so ``favorite_count`` is adjusted here explicitly.
+"""
+
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from . import counters
+from .models import FavoriteProperty, Property
+
+MAX_BATCH_SIZE = 500
+
+
+def favorite_ids(user, property_ids):
+    """The subset of ``property_ids`` that ``user`` has favorited."""
+    if not user.is_authenticated or not property_ids:
+        return set()
+    return set(
+        FavoriteProperty.objects.filter(user=user, property_id__in=property_ids)
+        .values_list('property_id', flat=True)
+    )
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    return quote(FavoriteProperty._meta.db_table), quote(Property._meta.db_table)
+
+
+def toggle(user, slug):
+    """
+    Flip one favorite by slug. Returns True if it is now a favorite, False
+    if it was removed, None if there is no such listing.
+    """
+    favorites, properties = _tables()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {favorites} WHERE user_id = %s "
+            f"AND property_id = (SELECT id FROM {properties} WHERE slug = %s)",
+            [user.pk, slug],
+        )
+        if cursor.rowcount:
+            counters.adjust_many(Property.objects.filter(slug=slug), 'favorite_count', -1)
+            return False
+        # INSERT ... ON CONFLICT DO NOTHING (or the backend's equivalent), so a
+        # concurrent toggle that inserted first doesn't break the transaction.
+        insert = connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)
+        suffix = connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])
+        cursor.execute(
+            f"{insert} {favorites} (user_id, property_id, added_at) "
+            f"SELECT %s, id, %s FROM {properties} WHERE slug = %s {suffix}",
+            [user.pk, connection.ops.adapt_datetimefield_value(timezone.now()), slug],
+        )
+        if not cursor.rowcount:
+            return True if Property.objects.filter(slug=slug).exists() else None
+        counters.adjust_many(Property.objects.filter(slug=slug), 'favorite_count', 1)
+        return True
+
+
+def _insert_many(cursor, user, property_ids):
+    """Favorite every existing listing in ``property_ids``; returns the ids actually inserted."""
+    favorites, properties = _tables()
+    insert = connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)
+    suffix = connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, [], [])
+    placeholders = ', '.join(['%s'] * len(property_ids))
+    cursor.execute(
+        f"{insert} {favorites} (user_id, property_id, added_at) "
+        f"SELECT %s, id, %s FROM {properties} WHERE id IN ({placeholders}) {suffix} RETURNING property_id",
+        [user.pk, connection.ops.adapt_datetimefield_value(timezone.now()), *property_ids],
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _delete_many(cursor, user, property_ids):
+    """Unfavorite ``property_ids``; returns the ids actually deleted."""
+    favorites, _ = _tables()
+    placeholders = ', '.join(['%s'] * len(property_ids))
+    cursor.execute(
+        f"DELETE FROM {favorites} WHERE user_id = %s AND property_id IN ({placeholders}) RETURNING property_id",
+        [user.pk, *property_ids],
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def update(user, add=(), remove=()):
+    """
+    Add and remove many favorites at once; returns the ids now favorited
+    among those given. Counters move only for the rows this call actually
+    inserted or deleted, so concurrent toggles of the same favorite can't
+    count it twice.
+    """
+    add, remove = set(add), set(remove) - set(add)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            added = _insert_many(cursor, user, sorted(add)) if add else set()
+            removed = _delete_many(cursor, user, sorted(remove)) if remove else set()
+        if added:
+            counters.adjust_many(Property.objects.filter(pk__in=added), 'favorite_count', 1)
+        if removed:
+            counters.adjust_many(Property.objects.filter(pk__in=removed), 'favorite_count', -1)
+        return favorite_ids(user, add | remove)
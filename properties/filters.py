@@ -0,0 +1,102 @@
+"""
+Listing filters shared by every view that narrows down ``Property`` rows from
+``PropertySearchForm``-style query parameters.
+"""
+
+import json
+import logging
+
+from . import geo, search
+from .counts import normalize_filters
+
+# Applied filter combinations, one JSON object per line, for
+# ``manage.py explain_filters``. Enabled by PROPERTY_FILTER_LOG.
+filter_log = logging.getLogger('properties.filters')
+
+
+def record_filters(params):
+    if filter_log.isEnabledFor(logging.INFO):
+        filters = normalize_filters(params)
+        if filters:
+            filter_log.info(json.dumps(filters, sort_keys=True))
+
+
+def filter_properties(queryset, params, rank=True):
+    """
+    Apply the listing filters found in ``params`` (usually ``request.GET``)
+    and return the queryset ordered for display: by relevance when a search
+    term is given, newest first otherwise. Pass ``rank=False`` when the rows
+    are only counted or grouped, to skip computing the relevance.
+    """
+    search_query = params.get('search', '').strip()
+    if search_query:
+        queryset = search.search_properties(queryset, search_query, rank=rank)
+
+    listing_type = params.get('listing_type', '')
+    if listing_type:
+        queryset = queryset.filter(listing_type=listing_type)
+
+    property_type = params.get('property_type', '')
+    if property_type:
+        queryset = queryset.filter(property_type=property_type)
+
+    city = params.get('city', '')
+    if city:
+        queryset = queryset.filter(city__icontains=city)
+
+    min_price = params.get('min_price')
+    if min_price:
+        try:
+            min_price = float(min_price)
+            queryset = queryset.filter(price__gte=min_price)
+        except (ValueError, TypeError):
+            pass
+
+    max_price = params.get('max_price')
+    if max_price:
+        try:
+            max_price = float(max_price)
+            queryset = queryset.filter(price__lte=max_price)
+        except (ValueError, TypeError):
+            pass
+
+    bedrooms = params.get('bedrooms')
+    if bedrooms:
+        try:
+            bedrooms = int(bedrooms)
+            queryset = queryset.filter(bedrooms__gte=bedrooms)
+        except (ValueError, TypeError):
+            pass
+
+    bathrooms = params.get('bathrooms')
+    if bathrooms:
+        try:
+            bathrooms = int(bathrooms)
+            queryset = queryset.filter(bathrooms__gte=bathrooms)
+        except (ValueError, TypeError):
+            pass
+
+    if params.get('is_furnished'):
+        queryset = queryset.filter(is_furnished=True)
+
+    if params.get('has_parking'):
+        queryset = queryset.filter(has_parking=True)
+
+    bbox = geo.parse_bbox(params)
+    if bbox:
+        queryset = geo.within_bbox(queryset, *bbox)
+
+    point = geo.parse_point(params)
+    if point:
+        queryset = geo.within_radius(queryset, *point)
+
+    if 'search_rank' in queryset.query.annotations:
+        return queryset.order_by('-search_rank', '-created_at')
+    return queryset.order_by('-created_at')
+
+
+def ordering_keys(queryset):
+    """Keyset pagination keys matching the order ``filter_properties`` applies."""
+    if 'search_rank' in queryset.query.annotations:
+        return ('search_rank', 'created_at', 'id')
+    return ('created_at', 'id')
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm, PasswordResetForm
+from django.db.models.functions import Lower
 from .models import Property, PropertyImage, PropertyInquiry
 
 
@@ -36,7 +37,7 @@ class SignUpForm(UserCreationForm):
 
     def clean_email(self):
         email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
+        if User.objects.alias(email_lower=Lower('email')).filter(email_lower=email.lower()).exists():
             raise forms.ValidationError('This email is already registered.')
         return email
 
@@ -236,6 +237,15 @@ class PropertySearchForm(forms.Form):
     has_parking = forms.BooleanField(required=False, widget=forms.CheckboxInput(attrs={
         'class': 'form-check-input',
     }))
+    lat = forms.FloatField(required=False, widget=forms.HiddenInput())
+    lng = forms.FloatField(required=False, widget=forms.HiddenInput())
+    radius = forms.FloatField(required=False, min_value=0, max_value=500, widget=forms.NumberInput(attrs={
+        'class': 'form-control',
+        'placeholder': 'Radius (km)',
+        'min': 0,
+        'step': 0.5,
+    }))
+    bbox = forms.CharField(required=False, widget=forms.HiddenInput())
 
 
 class PropertyImageForm(forms.ModelForm):
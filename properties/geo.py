@@ -0,0 +1,187 @@
+"""
+Geospatial filtering over ``Property.latitude``/``longitude``.
+
+Listings carry a geohash in an indexed column. A radius or viewport query is
+turned into a handful of geohash prefixes, each of which is a B-tree range
+scan, and radius candidates are then refined exactly by a haversine distance
+computed in the same query.
+"""
+
+import math
+
+from django.db.models import ExpressionWrapper, FloatField, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+GEOHASH_PRECISION = 12
+MAX_BBOX_CELLS = 16
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Sorts after every geohash character, so [prefix, prefix + '{') is the
+# range of all hashes starting with prefix.
+_RANGE_END = '{'
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    if latitude is None or longitude is None:
+        return ''
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = bits * 2 + 1
+                lng_range[0] = mid
+            else:
+                bits = bits * 2
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = bits * 2 + 1
+                lat_range[0] = mid
+            else:
+                bits = bits * 2
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(latitude span, longitude span) in degrees of a geohash cell."""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def _wrap_longitude(longitude):
+    return (longitude + 180.0) % 360.0 - 180.0
+
+
+def radius_cells(latitude, longitude, radius_km):
+    """Geohash prefixes whose union covers the circle."""
+    lat_km = radius_km / KM_PER_DEGREE
+    lng_km = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_span, lng_span = cell_size(candidate)
+        if lat_span >= lat_km and lng_span >= lng_km:
+            precision = candidate
+            break
+    lat_span, lng_span = cell_size(precision)
+    # The circle fits inside the 3x3 block of cells around its centre.
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lng_step in (-1, 0, 1):
+            cell_lat = min(max(latitude + lat_step * lat_span, -90.0), 90.0)
+            cell_lng = _wrap_longitude(longitude + lng_step * lng_span)
+            cells.add(encode_geohash(cell_lat, cell_lng, precision))
+    return sorted(cells)
+
+
+def bbox_cells(south, west, north, east):
+    """Geohash prefixes whose union covers the box, at most MAX_BBOX_CELLS."""
+    lng_width = (east - west) % 360.0 or 360.0
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_span, lng_span = cell_size(precision)
+        rows = math.floor(south / lat_span)
+        rows = math.floor(north / lat_span) - rows + 1
+        columns = math.ceil(lng_width / lng_span) + 1
+        if rows * columns <= MAX_BBOX_CELLS:
+            break
+    cells = set()
+    lat = south
+    while True:
+        lng_offset = 0.0
+        while True:
+            cells.add(encode_geohash(min(lat, 90.0), _wrap_longitude(west + lng_offset), precision))
+            if lng_offset >= lng_width:
+                break
+            lng_offset = min(lng_offset + lng_span, lng_width)
+        if lat >= north:
+            break
+        lat = min(lat + lat_span, north)
+    return sorted(cells)
+
+
+def _cells_condition(cells):
+    condition = Q()
+    for cell in cells:
+        condition |= Q(geohash__gte=cell, geohash__lt=cell + _RANGE_END)
+    return condition
+
+
+def radius_prefilter(latitude, longitude, radius_km):
+    """Index-friendly condition matching a superset of the listings within the radius."""
+    lat_delta = radius_km / KM_PER_DEGREE
+    return _cells_condition(radius_cells(latitude, longitude, radius_km)) & Q(
+        latitude__gte=latitude - lat_delta, latitude__lte=latitude + lat_delta,
+    )
+
+
+def distance_km(latitude, longitude):
+    """Great-circle distance (haversine) from a point, as a query expression."""
+    lat1 = math.radians(latitude)
+    lng1 = math.radians(longitude)
+    a = (
+        Power(Sin((Radians('latitude') - lat1) / 2), 2) +
+        math.cos(lat1) * Cos(Radians('latitude')) * Power(Sin((Radians('longitude') - lng1) / 2), 2)
+    )
+    return ExpressionWrapper(2 * EARTH_RADIUS_KM * ASin(Sqrt(a)), output_field=FloatField())
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    # Stays lazy: the exact distance is only computed, in SQL, for the
+    # prefiltered rows of queries that actually run.
+    return (
+        queryset.filter(radius_prefilter(latitude, longitude, radius_km))
+        .alias(radius_distance=distance_km(latitude, longitude))
+        .filter(radius_distance__lte=radius_km)
+    )
+
+
+def within_bbox(queryset, south, west, north, east):
+    queryset = queryset.filter(
+        _cells_condition(bbox_cells(south, west, north, east)),
+        latitude__gte=south,
+        latitude__lte=north,
+    )
+    if west <= east:
+        return queryset.filter(longitude__gte=west, longitude__lte=east)
+    # The viewport crosses the antimeridian.
+    return queryset.filter(Q(longitude__gte=west) | Q(longitude__lte=east))
+
+
+def parse_point(params):
+    """(latitude, longitude, radius_km) from ``lat``/``lng``/``radius``, or None."""
+    try:
+        latitude = float(params.get('lat', ''))
+        longitude = float(params.get('lng', ''))
+        radius_km = float(params.get('radius', ''))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and 0 < radius_km <= 500):
+        return None
+    return latitude, longitude, radius_km
+
+
+def parse_bbox(params):
+    """(south, west, north, east) from ``bbox=south,west,north,east``, or None."""
+    try:
+        south, west, north, east = (float(value) for value in params.get('bbox', '').split(','))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        return None
+    return south, west, north, east
@@ -0,0 +1,113 @@
+"""
+Responsive image derivatives for ``PropertyImage``.
+
+Each upload is resized to a few fixed widths and encoded as AVIF (when the
+installed Pillow supports it), WebP and JPEG. Encoding runs in a process
+pool so it neither holds the GIL nor blocks the caller on CPU. Derivatives
+are written through the image field's storage next to the original and
+recorded in ``PropertyImage.variants`` as ``{format: {width: name}}``.
+"""
+
+import io
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+FORMATS = {
+    'avif': ('AVIF', 'avif', {'quality': 55}),
+    'webp': ('WEBP', 'webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+_pool = None
+
+
+def derivative_widths():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 1280)))
+
+
+def available_formats():
+    return [name for name in FORMATS if name != 'avif' or features.check('avif')]
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2))
+    return _pool
+
+
+def render_variants(data, widths, formats):
+    """Encode every (format, width) variant of the image bytes ``data``."""
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGB')
+    variants = {}
+    # Never upscale; the smallest width is always produced.
+    usable = [width for width in widths if width < image.width] or [min(widths)]
+    for width in usable:
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        for name in formats:
+            pil_format, _, options = FORMATS[name]
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+            variants[(name, resized.width)] = buffer.getvalue()
+    return variants
+
+
+def derivative_name(original_name, width, name):
+    directory, filename = posixpath.split(original_name)
+    stem = os.path.splitext(filename)[0]
+    return posixpath.join(directory, 'derivatives', f'{stem}-{width}w.{FORMATS[name][1]}')
+
+
+def _read(image_obj):
+    field = image_obj.image
+    field.open('rb')
+    try:
+        return field.read()
+    finally:
+        field.close()
+
+
+def _store(image_obj, rendered):
+    storage = image_obj.image.storage
+    variants = {}
+    for (name, width), data in rendered.items():
+        stored = storage.save(derivative_name(image_obj.image.name, width, name), io.BytesIO(data))
+        variants.setdefault(name, {})[str(width)] = stored
+    return variants
+
+
+def generate_derivatives(image_obj):
+    """Render, store and record the derivatives of one image."""
+    data = _read(image_obj)
+    rendered = get_pool().submit(render_variants, data, derivative_widths(), available_formats()).result()
+    delete_derivatives(image_obj)
+    image_obj.variants = _store(image_obj, rendered)
+    image_obj.save(update_fields=['variants'])
+    return image_obj.variants
+
+
+def generate_many(images):
+    """Generate derivatives for many images, encoding them in parallel."""
+    pool = get_pool()
+    widths, formats = derivative_widths(), available_formats()
+    pending = [(image_obj, pool.submit(render_variants, _read(image_obj), widths, formats)) for image_obj in images]
+    for image_obj, future in pending:
+        delete_derivatives(image_obj)
+        image_obj.variants = _store(image_obj, future.result())
+        image_obj.save(update_fields=['variants'])
+        yield image_obj
+
+
+def delete_derivatives(image_obj):
+    storage = image_obj.image.storage
+    for names in (image_obj.variants or {}).values():
+        for name in names.values():
+            storage.delete(name)
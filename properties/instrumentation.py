@@ -0,0 +1,98 @@
+"""
+Per-request performance measurements.
+
+``RequestMetrics`` collects the query count, SQL time, repeated queries and
+template render time of one request. ``RequestTimingMiddleware`` (see
+middleware.py) installs it on the request: queries are recorded by a
+``connection.execute_wrapper`` and render time by the ``DjangoTemplates``
+backend below, which only times top-level templates (includes are part of
+their parent's render).
+"""
+
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def current():
+    """The ``RequestMetrics`` of the request being measured, if any."""
+    return _current.get()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+        self._rendering = 0
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+            # SQL is parameterized, so the statement text is its signature.
+            self.statements[sql] += 1
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def duplicate_queries(self):
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def repeated(self, limit=3):
+        """The most repeated statements as ``(sql, count)`` pairs, likely N+1s."""
+        return [(sql, count) for sql, count in self.statements.most_common(limit) if count > 1]
+
+    def server_timing(self):
+        return ', '.join([
+            'db;desc="%d queries";dur=%.1f' % (self.queries, self.sql_time * 1000),
+            'dup;desc="%d duplicate queries"' % self.duplicate_queries,
+            'tpl;dur=%.1f' % (self.template_time * 1000),
+            'total;dur=%.1f' % (self.elapsed * 1000),
+        ])
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None or metrics._rendering:
+            return super().render(context, request)
+        metrics._rendering += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+            metrics._rendering -= 1
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The stock Django template backend, with render time measurement."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
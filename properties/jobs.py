@@ -0,0 +1,183 @@
+"""
+Database-backed background jobs.
+
+Slow work (photo processing, image encoding) is recorded as ``BackgroundJob``
+rows and run by ``manage.py process_jobs``, so requests return as soon as
+the row is written. Uploaded photos are spooled to local disk under
+``UPLOAD_SPOOL_DIR`` and only their names are queued, so the worker makes
+the one upload to media storage. Workers claim jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports it and
+with a conditional ``UPDATE ... WHERE status = 'pending'`` elsewhere, so
+any number of workers can share the table. Finished jobs are deleted;
+failures are retried with exponential backoff until ``JOB_MAX_ATTEMPTS``.
+"""
+
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import images, recommendations
+from .models import BackgroundJob, Property, PropertyImage
+
+logger = logging.getLogger(__name__)
+
+PROPERTY_IMAGE = 'property_image'
+IMAGE_DERIVATIVES = 'image_derivatives'
+SIMILAR_PROPERTIES = 'similar_properties'
+ACTIVE_STATUSES = ('pending', 'running')
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(kind, payload=None, property_obj=None):
+    return BackgroundJob.objects.create(kind=kind, payload=payload or {}, property=property_obj)
+
+
+def spool_storage():
+    """Where uploads wait for the worker: local disk, never the remote media storage."""
+    return FileSystemStorage(location=settings.UPLOAD_SPOOL_DIR)
+
+
+def discard_upload(job):
+    """Delete the spooled upload of an image job, if it still has one."""
+    name = job.payload.get('upload')
+    if name:
+        spool_storage().delete(name)
+
+
+def enqueue_image_uploads(property_obj, files, first_is_primary=False):
+    """Spool uploaded files to disk and queue them; returns the number queued."""
+    spool = spool_storage()
+    jobs = [
+        BackgroundJob(
+            kind=PROPERTY_IMAGE,
+            property=property_obj,
+            payload={
+                'name': upload.name,
+                # Copied chunk by chunk, or just moved when Django already
+                # streamed a large upload to a temporary file.
+                'upload': spool.save(upload.name, upload),
+                'is_primary': first_is_primary and index == 0,
+            },
+        )
+        for index, upload in enumerate(files)
+    ]
+    BackgroundJob.objects.bulk_create(jobs)
+    return len(jobs)
+
+
+def enqueue_similar_refresh(property_obj):
+    """Queue a neighbour refresh for a saved listing unless one is already waiting."""
+    waiting = BackgroundJob.objects.filter(kind=SIMILAR_PROPERTIES, property=property_obj, status='pending')
+    if not waiting.exists():
+        enqueue(SIMILAR_PROPERTIES, {'property_id': property_obj.pk}, property_obj=property_obj)
+
+
+def pending_image_count(property_obj):
+    return BackgroundJob.objects.filter(
+        property=property_obj, kind=PROPERTY_IMAGE, status__in=ACTIVE_STATUSES
+    ).count()
+
+
+def release_stale_locks():
+    """Return jobs whose worker died mid-run to the queue."""
+    timeout = getattr(settings, 'JOB_LOCK_TIMEOUT', 600)
+    return BackgroundJob.objects.filter(
+        status='running', locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status='pending', locked_at=None, locked_by='')
+
+
+def claim(worker, limit=10, kinds=None):
+    """Atomically mark up to ``limit`` due jobs as running for ``worker``."""
+    now = timezone.now()
+    due = BackgroundJob.objects.filter(status='pending', run_after__lte=now)
+    if kinds:
+        due = due.filter(kind__in=kinds)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            BackgroundJob.objects.filter(id__in=ids).update(status='running', locked_at=now, locked_by=worker)
+    else:
+        ids = []
+        for job_id in due.values_list('id', flat=True)[:limit]:
+            # Losing the race to another worker updates no rows.
+            if BackgroundJob.objects.filter(id=job_id, status='pending').update(
+                status='running', locked_at=now, locked_by=worker
+            ):
+                ids.append(job_id)
+    return list(BackgroundJob.objects.filter(id__in=ids, locked_by=worker).order_by('run_after', 'id'))
+
+
+def run(job):
+    """Run one claimed job; returns True if it succeeded."""
+    try:
+        function = HANDLERS[job.kind]
+    except KeyError:
+        _fail(job, f'No handler for job kind {job.kind!r}', retry=False)
+        return False
+    try:
+        function(job)
+    except Exception:
+        logger.exception('%s failed', job)
+        _fail(job, traceback.format_exc())
+        return False
+    BackgroundJob.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def _fail(job, error, retry=True):
+    attempts = job.attempts + 1
+    max_attempts = getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+    if retry and attempts < max_attempts:
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            status='pending', attempts=attempts, error=error, locked_at=None, locked_by='',
+            run_after=timezone.now() + timedelta(seconds=30 * 2 ** (attempts - 1)),
+        )
+        return
+    BackgroundJob.objects.filter(pk=job.pk).update(
+        status='failed', attempts=attempts, error=error, locked_at=None, locked_by=''
+    )
+    discard_upload(job)
+    if job.property_id:
+        # Re-render cached cards that were showing the processing placeholder.
+        Property.objects.filter(pk=job.property_id).update(updated_at=timezone.now())
+
+
+@handler(PROPERTY_IMAGE)
+def store_property_image(job):
+    # The spooled file is removed with the job (see signals.py).
+    image = PropertyImage(property_id=job.property_id, is_primary=job.payload.get('is_primary', False))
+    with spool_storage().open(job.payload['upload']) as upload:
+        image.image.save(job.payload.get('name') or 'upload.jpg', upload, save=False)
+    image.save()
+
+
+@handler(IMAGE_DERIVATIVES)
+def generate_image_derivatives(job):
+    image = PropertyImage.objects.filter(pk=job.payload['image_id']).first()
+    if image is not None:
+        images.generate_derivatives(image)
+
+
+@handler(SIMILAR_PROPERTIES)
+def refresh_similar_properties(job):
+    recommendations.refresh_property(job.payload['property_id'])
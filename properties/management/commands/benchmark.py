@@ -0,0 +1,263 @@
+import json
+import platform
+import queue
+import random
+import re
+import statistics
+import threading
+import time
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from properties.models import Property
+
+SERVER_TIMING_QUERIES = re.compile(r'db;desc="(\d+) queries"')
+
+
+def _detail(context):
+    return reverse('property-detail', args=[context['rng_slug']()])
+
+
+def _search(context):
+    terms = context['rng'].choice(['sunny', 'park', 'metro station', 'renovated villa', 'lake'])
+    return reverse('property-list') + '?' + urlencode({'search': terms})
+
+
+def _filtered(context):
+    city = context['rng'].choice(context['cities'])
+    return reverse('property-list') + '?' + urlencode({'city': city, 'bedrooms': 2, 'listing_type': 'sale'})
+
+
+# name -> (method, URL builder, needs a signed-in user)
+ROUTES = {
+    'home': ('GET', lambda context: reverse('home'), False),
+    'property-list': ('GET', lambda context: reverse('property-list'), False),
+    'property-list-filtered': ('GET', _filtered, False),
+    'property-search': ('GET', _search, False),
+    'property-detail': ('GET', _detail, False),
+    'property-feed': ('GET', lambda context: reverse('property-feed'), False),
+    'property-map': ('GET', lambda context: reverse('property-map'), False),
+    'api-listings': ('GET', lambda context: reverse('api-listings'), False),
+    'api-listing-detail': ('GET', lambda context: reverse('api-listing-detail', args=[context['rng_slug']()]), False),
+    'api-facets': ('GET', lambda context: reverse('api-facets'), False),
+    'dashboard': ('GET', lambda context: reverse('dashboard'), True),
+    'saved-properties': ('GET', lambda context: reverse('saved-properties'), True),
+    'my-inquiries': ('GET', lambda context: reverse('my-inquiries'), True),
+    # Each run favorites and unfavorites the same listing, leaving no trace.
+    'toggle-favorite': ('POST', lambda context: reverse('toggle-favorite', args=[context['rng_slug']()]), True),
+}
+DEFAULT_ROUTES = [name for name in ROUTES if name != 'property-map']
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the real URL conf in-process with concurrent clients and report throughput and '
+        'p50/p95/p99 latency per route. Results can be saved as JSON and compared against a '
+        'baseline run. Seed data first with seed_synthetic.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--routes', help='Comma-separated routes (default: %s).' % ','.join(DEFAULT_ROUTES))
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per route.')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per route first.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Client threads per route.')
+        parser.add_argument('--user', help='Username for signed-in routes (default: the busiest listing owner).')
+        parser.add_argument('--cold-cache', action='store_true', help='Clear the cache before each route.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare against.')
+        parser.add_argument('--max-regression', type=float,
+                            help='Fail if any route\'s p95 is this many percent slower than the baseline.')
+
+    def handle(self, *args, **options):
+        names = options['routes'].split(',') if options['routes'] else DEFAULT_ROUTES
+        unknown = sorted(set(names) - set(ROUTES))
+        if unknown:
+            raise CommandError('Unknown routes: %s. Choose from %s.' % (', '.join(unknown), ', '.join(ROUTES)))
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be at least 1.')
+        if settings.DEBUG:
+            self.stderr.write('DEBUG is on: every query is recorded, so timings are pessimistic.')
+
+        slugs = list(Property.objects.active().order_by('?').values_list('slug', flat=True)[:500])
+        if not slugs:
+            raise CommandError('No active listings; run seed_synthetic first.')
+        user = self.get_user(options['user'])
+        if user is None and any(ROUTES[name][2] for name in names):
+            self.stderr.write('No user to sign in with; skipping signed-in routes.')
+            names = [name for name in names if not ROUTES[name][2]]
+        cities = list(Property.objects.active().values_list('city', flat=True).distinct()[:20])
+
+        baseline = self.load_baseline(options['baseline'])
+        results = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'listings': Property.objects.count(),
+                'active_listings': Property.objects.active().count(),
+                'users': User.objects.count(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'debug': settings.DEBUG,
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+                'cold_cache': options['cold_cache'],
+            },
+            'routes': {},
+        }
+        # The test client's host must be allowed, and query counts are read
+        # from the Server-Timing header of every response.
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            REQUEST_METRICS_SAMPLE_RATE=1.0,
+            REQUEST_METRICS_SERVER_TIMING=True,
+        ):
+            for index, name in enumerate(names):
+                if options['cold_cache']:
+                    for backend in caches.all():
+                        backend.clear()
+                results['routes'][name] = self.run_route(
+                    name, user, slugs, cities, options, seed=options['seed'] + index,
+                )
+                self.report(name, results['routes'][name], baseline)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}.')
+        if baseline and options['max_regression'] is not None:
+            self.check_regressions(results, baseline, options['max_regression'])
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'No user named {username}.')
+            return user
+        owner = (
+            Property.objects.values('owner').annotate(listings=Count('id')).order_by('-listings')
+            .values_list('owner', flat=True).first()
+        )
+        return User.objects.filter(pk=owner).first() if owner else None
+
+    def load_baseline(self, path):
+        if not path:
+            return None
+        with open(path) as f:
+            baseline = json.load(f)
+        listings = Property.objects.count()
+        if abs(baseline['meta']['listings'] - listings) > 0.1 * max(listings, 1):
+            self.stderr.write(
+                f'Baseline was taken with {baseline["meta"]["listings"]} listings; this database has {listings}.'
+            )
+        return baseline
+
+    def run_route(self, name, user, slugs, cities, options, seed):
+        method, build_url, needs_user = ROUTES[name]
+        latencies, query_counts, errors = [], [], []
+        lock = threading.Lock()
+
+        def worker(tickets, worker_seed, record):
+            rng = random.Random(worker_seed)
+            context = {'rng': rng, 'rng_slug': lambda: rng.choice(slugs), 'cities': cities}
+            client = Client()
+            if needs_user:
+                client.force_login(user)
+            try:
+                while True:
+                    try:
+                        tickets.get_nowait()
+                    except queue.Empty:
+                        return
+                    url = build_url(context)
+                    start = time.perf_counter()
+                    if method == 'POST':
+                        response = client.post(url, secure=True)
+                        client.post(url, secure=True)
+                    else:
+                        response = client.get(url, secure=True)
+                    elapsed = time.perf_counter() - start
+                    if not record:
+                        continue
+                    match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+                    with lock:
+                        latencies.append(elapsed)
+                        if match:
+                            query_counts.append(int(match.group(1)))
+                        if response.status_code >= 400:
+                            errors.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        def drive(count, record, pass_seed):
+            tickets = queue.Queue()
+            for ticket in range(count):
+                tickets.put(ticket)
+            threads = [
+                threading.Thread(target=worker, args=(tickets, pass_seed * 1000 + index, record))
+                for index in range(options['concurrency'])
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return time.perf_counter() - started
+
+        if options['warmup']:
+            drive(options['warmup'], False, seed + 10_000)
+        wall = drive(options['requests'], True, seed)
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': len(errors),
+            'error_statuses': sorted(set(errors)),
+            'throughput': round(len(latencies) / wall, 1) if wall else None,
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+            'queries': statistics.median(query_counts) if query_counts else None,
+        }
+
+    def report(self, name, result, baseline):
+        line = (
+            f'{name:24} {result["throughput"]:>8} req/s  p50 {result["p50_ms"]:>8.2f}  '
+            f'p95 {result["p95_ms"]:>8.2f}  p99 {result["p99_ms"]:>8.2f} ms  queries {result["queries"]}'
+        )
+        previous = (baseline or {}).get('routes', {}).get(name)
+        if previous:
+            change = (result['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+            line += f'  p95 {change:+.1f}% vs baseline'
+        if result['errors']:
+            line += f'  {result["errors"]} errors {result["error_statuses"]}'
+        self.stdout.write(line)
+
+    def check_regressions(self, results, baseline, limit):
+        regressed = []
+        for name, result in results['routes'].items():
+            previous = baseline['routes'].get(name)
+            if previous and result['p95_ms'] > previous['p95_ms'] * (1 + limit / 100):
+                regressed.append(f'{name} ({previous["p95_ms"]} -> {result["p95_ms"]} ms)')
+        if regressed:
+            raise CommandError('p95 regressed by more than %s%%: %s' % (limit, ', '.join(regressed)))
+        self.stdout.write(self.style.SUCCESS(f'No route regressed by more than {limit}%.'))
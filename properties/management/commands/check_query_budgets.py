@@ -0,0 +1,24 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.query_budgets import BUDGETS
+
+TEST_CASE = 'properties.tests.test_query_budgets.QueryBudgetTests'
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the per-route query budget tests (properties/tests/test_query_budgets.py). '
+        'Same as "manage.py test properties.tests.test_query_budgets".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--routes', help='Comma-separated routes to check (default: all).')
+
+    def handle(self, *args, **options):
+        names = options['routes'].split(',') if options['routes'] else []
+        unknown = sorted(set(names) - set(BUDGETS))
+        if unknown:
+            raise CommandError('No budget for: %s.' % ', '.join(unknown))
+        labels = ['%s.test_%s' % (TEST_CASE, name.replace('-', '_')) for name in names] or [TEST_CASE]
+        call_command('test', *labels, verbosity=options['verbosity'])
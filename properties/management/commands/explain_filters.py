@@ -0,0 +1,106 @@
+import json
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from properties.filters import filter_properties
+from properties.models import Property
+
+# Used when no filter log has been recorded yet.
+BUILTIN_COMBINATIONS = [
+    {},
+    {'listing_type': 'sale'},
+    {'listing_type': 'rent', 'property_type': 'apartment'},
+    {'listing_type': 'sale', 'property_type': 'house', 'min_price': '100000', 'max_price': '500000'},
+    {'min_price': '1000', 'max_price': '20000'},
+    {'listing_type': 'rent', 'bedrooms': '2'},
+    {'listing_type': 'rent', 'bedrooms': '2', 'bathrooms': '2'},
+    {'city': 'pune'},
+    {'search': 'apartment'},
+    {'is_furnished': 'on', 'has_parking': 'on'},
+    {'lat': '18.52', 'lng': '73.85', 'radius': '5'},
+]
+
+FULL_SCAN_PATTERNS = {
+    # Without a "(column=?)" constraint, SCAN ... USING INDEX still reads the
+    # whole index, filtering row by row.
+    'sqlite': re.compile(r'\bSCAN (\w+)( USING (COVERING )?INDEX \w+)?$'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'mysql': re.compile(r'\btype: ALL\b'),
+}
+SORT_PATTERNS = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+    'postgresql': re.compile(r'^\s*(->\s*)?Sort\b'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay recorded listing filter combinations through EXPLAIN and report '
+        'the ones whose plans scan the whole table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=getattr(settings, 'PROPERTY_FILTER_LOG', ''),
+                            help='Filter log written via PROPERTY_FILTER_LOG (default: built-in combinations).')
+        parser.add_argument('--limit', type=int, default=50, help='Most frequent filter shapes to explain.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just problems.')
+
+    def handle(self, *args, **options):
+        combinations = self.load(options['log'])
+        vendor = connection.vendor
+        full_scan = FULL_SCAN_PATTERNS.get(vendor)
+        sort = SORT_PATTERNS.get(vendor)
+        if full_scan is None:
+            raise CommandError(f'No plan patterns for the {vendor} backend.')
+
+        problems = 0
+        for shape, (params, seen) in list(combinations.items())[:options['limit']]:
+            queryset = filter_properties(Property.objects.active(), params)[:13]
+            plan = queryset.explain()
+            scans = [
+                line.strip() for line in plan.splitlines()
+                if full_scan.search(line.strip()) and 'VIRTUAL TABLE' not in line
+            ]
+            if not params:
+                # Unfiltered pages walk the ordering index and stop at the LIMIT.
+                scans = [line for line in scans if 'INDEX' not in line]
+            sorts = [line.strip() for line in plan.splitlines() if sort and sort.search(line)]
+            label = ', '.join(shape) or '(no filters)'
+            if scans:
+                problems += 1
+                self.stdout.write(self.style.WARNING(f'[FULL SCAN] {label}  (seen {seen}x)'))
+                self.stdout.write(self.indent(plan))
+            else:
+                # A sort after an index range read is bounded by the range; note it only.
+                status = 'ok, sorted' if sorts else 'ok'
+                self.stdout.write(f'[{status}] {label}  (seen {seen}x)')
+                if options['verbose_plans']:
+                    self.stdout.write(self.indent(plan))
+
+        summary = f'{problems} of {min(len(combinations), options["limit"])} filter shapes scan the whole table.'
+        self.stdout.write(self.style.WARNING(summary) if problems else self.style.SUCCESS(summary))
+
+    def load(self, path):
+        """Map each filter shape (sorted names) to its latest values and frequency."""
+        if not path:
+            records = BUILTIN_COMBINATIONS
+        else:
+            try:
+                with open(path) as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Could not read {path}: {exc}')
+        seen = Counter()
+        latest = {}
+        for params in records:
+            shape = tuple(sorted(params))
+            seen[shape] += 1
+            latest[shape] = params
+        return {shape: (latest[shape], count) for shape, count in seen.most_common()}
+
+    def indent(self, plan):
+        return '\n'.join('    ' + line for line in plan.splitlines())
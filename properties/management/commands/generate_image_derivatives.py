@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from properties import images
+from properties.models import PropertyImage
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail/WebP/AVIF derivatives for property images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerate every image, not just those without derivatives.')
+        parser.add_argument('--batch-size', type=int, default=16)
+
+    def handle(self, *args, **options):
+        queryset = PropertyImage.objects.order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(variants={})
+        done = failed = 0
+        batch = []
+        for image_obj in queryset.iterator(chunk_size=options['batch_size']):
+            batch.append(image_obj)
+            if len(batch) >= options['batch_size']:
+                done, failed = self.process(batch, done, failed)
+                batch = []
+        if batch:
+            done, failed = self.process(batch, done, failed)
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {done} images ({failed} failed).'))
+
+    def process(self, batch, done, failed):
+        readable = []
+        for image_obj in batch:
+            if image_obj.image.storage.exists(image_obj.image.name):
+                readable.append(image_obj)
+            else:
+                self.stderr.write(f'Image {image_obj.pk}: {image_obj.image.name} is missing from storage')
+                failed += 1
+        try:
+            for _ in images.generate_many(readable):
+                done += 1
+        except Exception as exc:
+            self.stderr.write(f'Batch starting at image {batch[0].pk} failed: {exc}')
+            failed += len(readable)
+        return done, failed
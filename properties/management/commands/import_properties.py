@@ -0,0 +1,256 @@
+import csv
+import json
+import os
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DataError, IntegrityError, transaction
+
+from properties import search
+from properties.caching import bump_listings_version
+from properties.forms import PropertyForm
+from properties.geo import encode_geohash
+from properties.models import Property, PropertyImage
+from properties.slugs import allocate_slugs
+
+BOOLEAN_FIELDS = ('is_furnished', 'has_parking', 'has_balcony', 'has_garden', 'has_pool', 'has_gym')
+FALSE_VALUES = ('', '0', 'no', 'n', 'false', 'off')
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream listings from a CSV or JSONL file into the database in batches. '
+        'Rows are validated with PropertyForm, invalid rows are reported and skipped, '
+        'and progress is checkpointed so an interrupted import can be resumed without '
+        'importing any row twice.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSONL file of listings.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format; guessed from the file extension by default.')
+        parser.add_argument('--owner', help='Username owning rows that have no "owner" column.')
+        parser.add_argument('--images-root', default='.',
+                            help='Directory that relative paths in the "images" column are resolved against.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--checkpoint',
+                            help='Checkpoint file (default: <path>.checkpoint). Existing checkpoints are resumed.')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        checkpoint = options['checkpoint'] or path + '.checkpoint'
+        self.images_root = options['images_root']
+        self.owners = {}
+        self.default_owner = self.get_owner(options['owner']) if options['owner'] else None
+        if options['owner'] and self.default_owner is None:
+            raise CommandError(f'No user named {options["owner"]}.')
+
+        resume_after = 0
+        if os.path.exists(checkpoint) and not options['restart']:
+            resume_after = self.read_checkpoint(checkpoint)
+            self.stdout.write(f'Resuming after row {resume_after}.')
+
+        imported = failed = 0
+        batch = []
+        committed_row = last_row = resume_after
+        for row_number, row in self.read_rows(path, file_format):
+            if row_number <= resume_after:
+                continue
+            last_row = row_number
+            listing = self.build_listing(row_number, row)
+            if listing is None:
+                failed += 1
+                continue
+            batch.append(listing)
+            if len(batch) >= options['batch_size']:
+                added = self.flush(batch, checkpoint, committed_row, last_row)
+                imported += added
+                failed += len(batch) - added
+                committed_row = last_row
+                batch = []
+        if batch:
+            added = self.flush(batch, checkpoint, committed_row, last_row)
+            imported += added
+            failed += len(batch) - added
+        self.write_checkpoint(checkpoint, last_row)
+
+        if imported:
+            bump_listings_version()
+        os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} properties ({failed} rows rejected). '
+            'Run rebuild_similar_properties to include them in recommendations '
+            'and generate_image_derivatives to create their responsive images.'
+        ))
+
+    def read_rows(self, path, file_format):
+        with open(path, newline='', encoding='utf-8') as f:
+            if file_format == 'csv':
+                for row_number, row in enumerate(csv.DictReader(f), start=1):
+                    yield row_number, row
+            else:
+                for row_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield row_number, json.loads(line)
+                    except ValueError as exc:
+                        yield row_number, {'__error__': f'invalid JSON: {exc}'}
+
+    def get_owner(self, username):
+        if username not in self.owners:
+            self.owners[username] = User.objects.filter(username=username).first()
+        return self.owners[username]
+
+    def report(self, row_number, message):
+        self.stderr.write(f'Row {row_number}: {message}')
+
+    def build_listing(self, row_number, row):
+        if '__error__' in row:
+            self.report(row_number, row['__error__'])
+            return None
+
+        data = dict(row)
+        for name in PropertyForm._meta.fields:
+            field = Property._meta.get_field(name)
+            if data.get(name) in (None, '') and field.has_default():
+                data[name] = field.get_default()
+        for field in BOOLEAN_FIELDS:
+            value = data.get(field)
+            if isinstance(value, str):
+                data[field] = 'false' if value.strip().lower() in FALSE_VALUES else 'true'
+        form = PropertyForm(data)
+        if not form.is_valid():
+            errors = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in form.errors.items())
+            self.report(row_number, errors)
+            return None
+
+        owner = self.get_owner(row['owner']) if row.get('owner') else self.default_owner
+        if owner is None:
+            self.report(row_number, f'unknown owner {row.get("owner")!r}' if row.get('owner') else 'no owner')
+            return None
+
+        property_obj = form.save(commit=False)
+        property_obj.owner = owner
+        try:
+            for field in ('latitude', 'longitude'):
+                if row.get(field) not in (None, ''):
+                    setattr(property_obj, field, float(row[field]))
+        except (TypeError, ValueError):
+            self.report(row_number, 'latitude/longitude must be numbers')
+            return None
+        property_obj.geohash = encode_geohash(property_obj.latitude, property_obj.longitude)
+
+        images = row.get('images') or []
+        if isinstance(images, str):
+            images = [image.strip() for image in images.split('|') if image.strip()]
+        return row_number, property_obj, images
+
+    def flush(self, batch, checkpoint, committed_row, last_row):
+        """Import one batch in one transaction; returns the number of listings imported."""
+        try:
+            with self.stored_files() as stored, transaction.atomic():
+                listings = self.insert(batch, stored)
+                self.write_checkpoint(checkpoint, committed_row, pending=(last_row, listings))
+        except IntegrityError:
+            # Another writer claimed one of the pre-allocated slugs; fall back
+            # to per-row saves, which retry slug allocation themselves.
+            with self.stored_files() as stored, transaction.atomic():
+                listings = self.insert_rows(batch, stored)
+                self.write_checkpoint(checkpoint, committed_row, pending=(last_row, listings))
+        self.write_checkpoint(checkpoint, last_row)
+        return len(listings)
+
+    def insert(self, batch, stored):
+        listings = [property_obj for _, property_obj, _ in batch]
+        for property_obj, slug in zip(listings, allocate_slugs(Property.objects.all(), [p.title for p in listings])):
+            property_obj.slug = slug
+        Property.objects.bulk_create(listings)
+        self.attach_images(batch, stored)
+        search.index_properties([property_obj.pk for property_obj in listings])
+        return listings
+
+    def insert_rows(self, batch, stored):
+        # Each row gets its own savepoint, so a row the database still
+        # rejects is reported and skipped instead of aborting the import.
+        listings = []
+        for row_number, property_obj, paths in batch:
+            property_obj.pk = None
+            property_obj.slug = ''
+            property_obj.photo_count = 0
+            try:
+                with self.stored_files() as row_files, transaction.atomic():
+                    property_obj.save()
+                    self.attach_images([(row_number, property_obj, paths)], row_files)
+            except (IntegrityError, DataError) as exc:
+                self.report(row_number, f'not imported: {exc}')
+                continue
+            stored.extend(row_files)
+            listings.append(property_obj)
+        search.index_properties([property_obj.pk for property_obj in listings])
+        return listings
+
+    @contextmanager
+    def stored_files(self):
+        """Collect the image files stored in the block; delete them if it fails, as their rows roll back."""
+        stored = []
+        try:
+            yield stored
+        except BaseException:
+            for name in stored:
+                PropertyImage.image.field.storage.delete(name)
+            raise
+
+    def attach_images(self, batch, stored):
+        images = []
+        for row_number, property_obj, paths in batch:
+            for index, path in enumerate(paths):
+                full_path = path if os.path.isabs(path) else os.path.join(self.images_root, path)
+                image = PropertyImage(property=property_obj, is_primary=index == 0)
+                try:
+                    with open(full_path, 'rb') as f:
+                        image.image.save(os.path.basename(full_path), File(f), save=False)
+                except OSError as exc:
+                    self.report(row_number, f'image {path} skipped: {exc}')
+                    continue
+                stored.append(image.image.name)
+                images.append(image)
+                property_obj.photo_count += 1
+        PropertyImage.objects.bulk_create(images)
+        # bulk_create skips the signals that maintain photo_count.
+        Property.objects.bulk_update([property_obj for _, property_obj, _ in batch], ['photo_count'])
+
+    def read_checkpoint(self, checkpoint):
+        """The last row already imported, settling a batch that was mid-commit."""
+        with open(checkpoint) as f:
+            state = json.load(f)
+        if isinstance(state, int):
+            # Checkpoints written before batches were tracked hold just the row.
+            return state
+        pending = state.get('pending')
+        if pending:
+            marker = pending['listing']
+            if marker is None or Property.objects.filter(pk=marker[0], slug=marker[1]).exists():
+                return pending['row']
+        return state['row']
+
+    def write_checkpoint(self, checkpoint, row_number, pending=None):
+        # Written just before a batch commits, ``pending`` names the batch's
+        # last listing: on resume, finding it means the batch did commit.
+        state = {'row': row_number}
+        if pending is not None:
+            last_row, listings = pending
+            state['pending'] = {
+                'row': last_row,
+                'listing': [listings[-1].pk, listings[-1].slug] if listings else None,
+            }
+        temporary = checkpoint + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(state, f)
+        os.replace(temporary, checkpoint)
@@ -0,0 +1,47 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from properties import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (photo uploads, image derivatives) until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed per round trip.')
+        parser.add_argument('--kind', action='append', dest='kinds', help='Only run jobs of this kind (repeatable).')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        worker = jobs.worker_name()
+        interval = getattr(settings, 'JOB_POLL_INTERVAL', 2)
+        succeeded = failed = 0
+
+        while not self.stopping:
+            close_old_connections()
+            jobs.release_stale_locks()
+            claimed = jobs.claim(worker, limit=options['batch_size'], kinds=options['kinds'])
+            if not claimed:
+                if options['once']:
+                    break
+                time.sleep(interval)
+                continue
+            for job in claimed:
+                if jobs.run(job):
+                    succeeded += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'{job} failed')
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {succeeded} jobs ({failed} failed).'))
+
+    def stop(self, signum, frame):
+        # Finish the current batch, then exit.
+        self.stopping = True
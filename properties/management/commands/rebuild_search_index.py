@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from properties import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all property listings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not search.is_supported(connection):
+            self.stdout.write(self.style.WARNING(
+                f'Full-text search is not available on {connection.vendor}; '
+                'listings are searched with icontains instead.'
+            ))
+            return
+        search.create_search_table(connection)
+        with transaction.atomic(using=options['database']):
+            total = search.rebuild(batch_size=options['batch_size'], using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} properties.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from properties import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed "similar properties" neighbour table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Listings per distance block; memory grows with batch size x listings. '
+                                 'Sized from SIMILAR_PROPERTIES_BLOCK_BYTES by default.')
+        parser.add_argument('-k', type=int, default=None, help='Neighbours stored per listing.')
+
+    def handle(self, *args, **options):
+        total = recommendations.rebuild(batch_size=options['batch_size'], k=options['k'])
+        self.stdout.write(self.style.SUCCESS(f'Computed neighbours for {total} properties.'))
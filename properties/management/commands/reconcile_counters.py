@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from properties import counters
+
+
+class Command(BaseCommand):
+    help = 'Repair drifted photo/favorite/pending-inquiry counters on listings.'
+
+    def handle(self, *args, **options):
+        repaired = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Repaired counters on {repaired} listings.'))
@@ -0,0 +1,271 @@
+import io
+import math
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from properties import search
+from properties.caching import bump_listings_version
+from properties.geo import encode_geohash
+from properties.models import FavoriteProperty, Property, PropertyImage, PropertyInquiry
+from properties.slugs import base_slug, random_slug
+
+USERNAME_PREFIX = 'synthetic-'
+PLACEHOLDER_IMAGES = 8
+
+# (city, state, latitude, longitude, sale price per sq. ft.); earlier cities
+# are more popular (Zipf weights).
+CITIES = [
+    ('Mumbai', 'Maharashtra', 19.076, 72.877, 24000),
+    ('Bangalore', 'Karnataka', 12.972, 77.594, 9000),
+    ('Pune', 'Maharashtra', 18.520, 73.856, 8000),
+    ('Delhi', 'Delhi', 28.614, 77.209, 14000),
+    ('Hyderabad', 'Telangana', 17.385, 78.487, 7500),
+    ('Chennai', 'Tamil Nadu', 13.083, 80.270, 7000),
+    ('Kolkata', 'West Bengal', 22.573, 88.364, 6000),
+    ('Ahmedabad', 'Gujarat', 23.023, 72.571, 5000),
+    ('Jaipur', 'Rajasthan', 26.912, 75.787, 4500),
+    ('Goa', 'Goa', 15.491, 73.828, 9500),
+]
+LOCALITIES = ['Central', 'North', 'South', 'East', 'West', 'Old Town', 'Lakeside', 'Hill View', 'Station Road', 'Tech Park']
+PROPERTY_TYPES = {
+    'apartment': 50, 'house': 14, 'villa': 6, 'studio': 8, 'penthouse': 2,
+    'townhouse': 5, 'commercial': 7, 'land': 5, 'other': 3,
+}
+LISTING_TYPES = {'sale': 60, 'rent': 35, 'lease': 5}
+BEDROOMS = {0: 4, 1: 18, 2: 36, 3: 26, 4: 11, 5: 4, 6: 1}
+CONDITIONS = {'old': 55, 'new': 30, 'renovated': 15}
+INQUIRY_STATUSES = {'pending': 55, 'responded': 25, 'completed': 12, 'rejected': 8}
+INQUIRY_TYPES = {'inquiry': 70, 'visit': 20, 'booking': 10}
+# Monthly rent as a share of the sale price.
+RENT_YIELD = 0.0035
+ADJECTIVES = ['Spacious', 'Sunny', 'Modern', 'Cozy', 'Renovated', 'Quiet', 'Elegant', 'Affordable', 'Luxury', 'Bright']
+AMENITIES = ['park', 'metro station', 'school', 'market', 'hospital', 'lake', 'mall', 'highway', 'beach', 'office hub']
+
+
+def _pick(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _skewed(rng, values, power):
+    """A random element of ``values``, biased towards the start."""
+    return values[int(len(values) * rng.random() ** power)]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk inserts set auto_now/auto_now_add fields themselves."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic users, listings, images, inquiries and favorites with bulk inserts, '
+        'for benchmarking (see the benchmark command). Synthetic users are named '
+        f'"{USERNAME_PREFIX}<n>" and own all the generated data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=10_000)
+        parser.add_argument('--users', type=int, help='Number of synthetic users (default: listings / 20, at least 10).')
+        parser.add_argument('--images-per-listing', type=float, default=4.0, help='Mean photos per listing.')
+        parser.add_argument('--inquiries-per-listing', type=float, default=0.5)
+        parser.add_argument('--favorites-per-listing', type=float, default=1.0)
+        parser.add_argument('--days', type=int, default=365, help='Spread creation dates over this many days.')
+        parser.add_argument('--password', default='synthetic', help='Password of every synthetic user.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--clear', action='store_true', help='Delete existing synthetic users and their data first.')
+
+    def handle(self, *args, **options):
+        if options['listings'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--listings must be >= 0 and --batch-size >= 1.')
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.options = options
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            self.stdout.write(f'Deleted {deleted} synthetic rows.')
+
+        user_ids = self.ensure_users(options['users'] or max(10, options['listings'] // 20), options['password'])
+        self.images = self.placeholder_images()
+
+        created = 0
+        timestamps = (
+            Property._meta.get_field('created_at'), Property._meta.get_field('updated_at'),
+            PropertyInquiry._meta.get_field('created_at'), PropertyInquiry._meta.get_field('updated_at'),
+            FavoriteProperty._meta.get_field('added_at'),
+        )
+        with explicit_timestamps(*timestamps):
+            while created < options['listings']:
+                size = min(options['batch_size'], options['listings'] - created)
+                with transaction.atomic():
+                    self.insert_batch(size, user_ids)
+                created += size
+                self.stdout.write(f'{created}/{options["listings"]} listings')
+
+        if created:
+            bump_listings_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} listings for {len(user_ids)} synthetic users. '
+            'Run rebuild_similar_properties to include them in recommendations.'
+        ))
+
+    def ensure_users(self, count, password):
+        existing = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk').values_list('pk', 'username')
+        )
+        suffixes = [int(name[len(USERNAME_PREFIX):]) for _, name in existing if name[len(USERNAME_PREFIX):].isdigit()]
+        start = max(suffixes, default=0) + 1
+        # Hashing once keeps seeding fast; every user shares the password.
+        password_hash = make_password(password)
+        new_users = [
+            User(
+                username=f'{USERNAME_PREFIX}{number}', email=f'{USERNAME_PREFIX}{number}@example.com',
+                first_name='Synthetic', last_name=str(number), password=password_hash,
+            )
+            for number in range(start, start + max(count - len(existing), 0))
+        ]
+        User.objects.bulk_create(new_users, batch_size=self.options['batch_size'])
+        return list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk').values_list('pk', flat=True))
+
+    def placeholder_images(self):
+        names = []
+        for index in range(PLACEHOLDER_IMAGES):
+            name = f'properties/synthetic/placeholder-{index}.jpg'
+            if not default_storage.exists(name):
+                hue = index * 360 // PLACEHOLDER_IMAGES
+                image = Image.new('HSV', (1280, 853), (hue * 255 // 360, 90, 200)).convert('RGB')
+                buffer = io.BytesIO()
+                image.save(buffer, 'JPEG', quality=70)
+                name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            names.append(name)
+        return names
+
+    def created_at(self):
+        # Recent listings are more common than old ones.
+        age = self.options['days'] * self.rng.random() ** 2
+        return self.now - timedelta(days=age)
+
+    def build_listing(self, owner_id):
+        rng = self.rng
+        city, state, latitude, longitude, rate = _skewed(rng, CITIES, 1.6)
+        property_type = _pick(rng, PROPERTY_TYPES)
+        listing_type = _pick(rng, LISTING_TYPES)
+        bedrooms = bathrooms = None
+        if property_type not in ('land', 'commercial'):
+            bedrooms = 0 if property_type == 'studio' else _pick(rng, BEDROOMS)
+            bathrooms = max(1, bedrooms - rng.randint(0, 1))
+        area = round(rng.lognormvariate(math.log(350 + 450 * (bedrooms or 2)), 0.3))
+        sale_price = area * rate * rng.lognormvariate(0, 0.25)
+        price = sale_price * RENT_YIELD if listing_type != 'sale' else sale_price
+        locality = rng.choice(LOCALITIES)
+        label = f'{bedrooms} BHK {property_type.title()}' if bedrooms else property_type.title()
+        title = f'{rng.choice(ADJECTIVES)} {label} in {locality}, {city}'
+        created_at = self.created_at()
+        lat = latitude + rng.gauss(0, 0.05)
+        lng = longitude + rng.gauss(0, 0.05)
+        return Property(
+            owner_id=owner_id,
+            title=title,
+            slug=random_slug(base_slug(title)),
+            description=(
+                f'{title}. {area} sq. ft., close to the {rng.choice(AMENITIES)} and the {rng.choice(AMENITIES)}. '
+                f'Well connected, {rng.choice(["east", "west", "north", "south"])} facing, '
+                f'{rng.choice(["ready to move", "available next month", "under renovation"])}.'
+            ),
+            property_type=property_type,
+            listing_type=listing_type,
+            condition=_pick(rng, CONDITIONS),
+            location=f'{rng.randint(1, 400)} {locality} Road',
+            city=city,
+            state=state,
+            postal_code=str(rng.randint(100000, 999999)),
+            latitude=lat,
+            longitude=lng,
+            geohash=encode_geohash(lat, lng),
+            bedrooms=bedrooms,
+            bathrooms=bathrooms,
+            area=area,
+            price=Decimal(round(price, -2 if listing_type == 'sale' else 0)).quantize(Decimal('0.01')),
+            is_furnished=rng.random() < 0.35,
+            has_parking=rng.random() < 0.6,
+            has_balcony=rng.random() < 0.5,
+            has_garden=rng.random() < 0.15,
+            has_pool=rng.random() < 0.05,
+            has_gym=rng.random() < 0.12,
+            is_active=rng.random() < 0.92,
+            is_featured=rng.random() < 0.05,
+            created_at=created_at,
+            updated_at=created_at + timedelta(days=rng.random() * (self.now - created_at).days),
+        )
+
+    def insert_batch(self, size, user_ids):
+        rng = self.rng
+        options = self.options
+        # A few agents own most listings.
+        listings = [self.build_listing(_skewed(rng, user_ids, 3)) for _ in range(size)]
+
+        plans = []
+        for listing in listings:
+            # Popular listings (featured ones) draw more favorites and inquiries.
+            popularity = 3 if listing.is_featured else 1
+            photos = 0
+            if options['images_per_listing'] and rng.random() > 0.08:
+                photos = max(1, round(rng.expovariate(1 / options['images_per_listing'])))
+            inquiry_count = favorites = 0
+            if options['inquiries_per_listing']:
+                inquiry_count = int(rng.expovariate(1 / (options['inquiries_per_listing'] * popularity)))
+            if options['favorites_per_listing']:
+                favorites = min(len(user_ids), int(rng.expovariate(1 / (options['favorites_per_listing'] * popularity))))
+            # One inquiry per sender and listing.
+            senders = rng.sample(user_ids, min(inquiry_count, len(user_ids)))
+            inquiries = [(_pick(rng, INQUIRY_STATUSES), sender_id) for sender_id in senders]
+            listing.photo_count = min(photos, 12)
+            listing.pending_inquiry_count = sum(1 for status, _ in inquiries if status == 'pending')
+            listing.favorite_count = favorites
+            plans.append((listing.photo_count, inquiries, rng.sample(user_ids, favorites)))
+
+        Property.objects.bulk_create(listings)
+
+        images, inquiries, favorites = [], [], []
+        for listing, (photo_count, listing_inquiries, fans) in zip(listings, plans):
+            for index in range(photo_count):
+                images.append(PropertyImage(
+                    property=listing, image=rng.choice(self.images), is_primary=index == 0,
+                ))
+            for status, sender_id in listing_inquiries:
+                sent = listing.created_at + (self.now - listing.created_at) * rng.random()
+                inquiries.append(PropertyInquiry(
+                    property=listing, sender_id=sender_id, name='Synthetic Buyer',
+                    email='buyer@example.com', phone='5550100',
+                    message=f'Is this {listing.property_type} still available?',
+                    inquiry_type=_pick(rng, INQUIRY_TYPES), status=status, created_at=sent, updated_at=sent,
+                ))
+            for user_id in fans:
+                favorites.append(FavoriteProperty(
+                    property=listing, user_id=user_id,
+                    added_at=listing.created_at + (self.now - listing.created_at) * rng.random(),
+                ))
+        PropertyImage.objects.bulk_create(images)
+        PropertyInquiry.objects.bulk_create(inquiries)
+        FavoriteProperty.objects.bulk_create(favorites)
+        search.index_properties([listing.pk for listing in listings])
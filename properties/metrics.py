@@ -0,0 +1,280 @@
+"""
+In-process metrics with a Prometheus text exposition.
+
+Each worker process keeps its own counters and histograms in memory and
+periodically writes a snapshot to ``METRICS_DIR/<pid>-<start>.json``. The
+``/metrics`` view merges every snapshot in that directory, so all gunicorn
+workers on the host are reported together without a shared server. Snapshots
+of exited workers are kept (counters must not go backwards) until they are
+older than ``METRICS_RETENTION``.
+
+Per-route latency quantiles (p50/p90/p99) are estimated from the histogram
+buckets, the same way Prometheus' ``histogram_quantile()`` does.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+QUANTILES = (0.5, 0.9, 0.99)
+
+COUNTERS = {
+    'http_requests_total': 'Requests served, by route, method and status.',
+    'cache_requests_total': 'Application cache lookups, by cache and result.',
+}
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Request latency, by route.', LATENCY_BUCKETS),
+    'db_queries_per_request': ('Database queries per request, by route.', QUERY_BUCKETS),
+}
+
+
+class Shard:
+    """The counters and histograms one thread updates."""
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    def merge_into(self, counters, histograms):
+        # dict.copy() and list() run without releasing the GIL, so these are
+        # consistent copies even while the owning thread keeps updating.
+        for key, value in self.counters.copy().items():
+            counters[key] += value
+        for key, histogram in self.histograms.copy().items():
+            merged = histograms.setdefault(key, {'buckets': None, 'sum': 0.0})
+            buckets = list(histogram['buckets'])
+            merged['buckets'] = buckets if merged['buckets'] is None else [
+                a + b for a, b in zip(merged['buckets'], buckets)
+            ]
+            merged['sum'] += histogram['sum']
+
+
+class Registry:
+    """
+    Counters and histograms of one process.
+
+    Every thread updates its own shard, so recording a request takes no lock
+    and request threads never wait on each other. ``snapshot()`` sums the
+    shards; the lock only guards the list of shards, and shards of threads
+    that have exited are folded into ``retired``.
+    """
+
+    def __init__(self):
+        self._reset()
+        # A forked worker starts from zero rather than from its parent's counts.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.name = '%d-%d' % (self.pid, time.time_ns())
+        self.local = threading.local()
+        self.shards = []
+        self.retired = Shard()
+        self.last_flush = time.monotonic()
+
+    def _shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = Shard()
+            with self.lock:
+                self.shards.append(shard)
+            return shard
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        self._shard().counters[key] += value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = HISTOGRAMS[name][1]
+        histograms = self._shard().histograms
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0}
+        index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+        # The count is the bucket total, so a snapshot can't see them disagree.
+        histogram['buckets'][index] += 1
+        histogram['sum'] += value
+
+    def snapshot(self):
+        counters = defaultdict(float)
+        histograms = {}
+        with self.lock:
+            for shard in [shard for shard in self.shards if not shard.thread.is_alive()]:
+                shard.merge_into(self.retired.counters, self.retired.histograms)
+                self.shards.remove(shard)
+            shards = [self.retired] + self.shards
+        for shard in shards:
+            shard.merge_into(counters, histograms)
+        return {
+            'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+            'histograms': [
+                [name, dict(labels), h['buckets'], h['sum'], sum(h['buckets'])]
+                for (name, labels), h in histograms.items()
+            ],
+        }
+
+    def flush(self):
+        directory = metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        data = self.snapshot()
+        fd, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as handle:
+            json.dump(data, handle)
+        os.replace(temp, os.path.join(directory, self.name + '.json'))
+        self.last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            self.flush()
+
+
+registry = Registry()
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'realestate-metrics')
+
+
+@atexit.register
+def _flush_at_exit():
+    if registry.shards or registry.retired.counters:
+        try:
+            registry.flush()
+        except Exception:
+            pass
+
+
+# ============ Recording ============
+
+def observe_request(route, method, status, duration, queries):
+    registry.inc('http_requests_total', {'route': route, 'method': method, 'status': str(status)})
+    registry.observe('http_request_duration_seconds', {'route': route}, duration)
+    registry.observe('db_queries_per_request', {'route': route}, queries)
+    registry.maybe_flush()
+
+
+def record_cache(cache_name, hit):
+    registry.inc('cache_requests_total', {'cache': cache_name, 'result': 'hit' if hit else 'miss'})
+
+
+# ============ Exposition ============
+
+def collect():
+    """Merge the snapshots of every worker into ``(counters, histograms)``."""
+    registry.flush()
+    counters = defaultdict(float)
+    histograms = {}
+    directory = metrics_dir()
+    expired = time.time() - getattr(settings, 'METRICS_RETENTION', 86400)
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        if not filename.endswith('.json'):
+            continue
+        try:
+            if os.path.getmtime(path) < expired:
+                os.remove(path)
+                continue
+            with open(path) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in data['counters']:
+            counters[(name, tuple(sorted(labels.items())))] += value
+        for name, labels, buckets, total, count in data['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            merged = histograms.setdefault(key, {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], buckets)]
+            merged['sum'] += total
+            merged['count'] += count
+    return counters, histograms
+
+
+def quantile(q, bounds, buckets):
+    """Estimate the ``q`` quantile from per-bucket (non-cumulative) counts."""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(buckets):
+        if seen + count >= rank and count:
+            if index == len(bounds):
+                return bounds[-1]
+            lower = bounds[index - 1] if index else 0
+            return lower + (bounds[index] - lower) * (rank - seen) / count
+        seen += count
+    return bounds[-1]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in items)
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    counters, histograms = collect()
+    lines = []
+
+    for name, help_text in COUNTERS.items():
+        lines += ['# HELP %s %s' % (name, help_text), '# TYPE %s counter' % name]
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append('%s%s %s' % (name, _labels(labels), _number(value)))
+
+    cache_totals = defaultdict(lambda: [0, 0])
+    for (metric, labels), value in counters.items():
+        if metric == 'cache_requests_total':
+            labels = dict(labels)
+            cache_totals[labels['cache']][labels['result'] == 'hit'] += value
+    lines += ['# HELP cache_hit_ratio Share of cache lookups that were hits.', '# TYPE cache_hit_ratio gauge']
+    for cache_name, (misses, hits) in sorted(cache_totals.items()):
+        lines.append('cache_hit_ratio%s %s' % (_labels((('cache', cache_name),)), _number(hits / (hits + misses))))
+
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines += ['# HELP %s %s' % (name, help_text), '# TYPE %s histogram' % name]
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(bounds + ('+Inf',), histogram['buckets']):
+                cumulative += count
+                lines.append('%s_bucket%s %d' % (name, _labels(labels, le=bound), cumulative))
+            lines.append('%s_sum%s %s' % (name, _labels(labels), _number(histogram['sum'])))
+            lines.append('%s_count%s %d' % (name, _labels(labels), histogram['count']))
+
+    name = 'http_request_duration_quantile_seconds'
+    lines += [
+        '# HELP %s Request latency quantiles estimated from the histogram buckets.' % name,
+        '# TYPE %s gauge' % name,
+    ]
+    for (metric, labels), histogram in sorted(histograms.items()):
+        if metric != 'http_request_duration_seconds':
+            continue
+        for q in QUANTILES:
+            value = quantile(q, LATENCY_BUCKETS, histogram['buckets'])
+            if value is not None:
+                lines.append('%s%s %s' % (name, _labels(labels, quantile=q), _number(value)))
+
+    return '\n'.join(lines) + '\n'
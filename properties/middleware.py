@@ -0,0 +1,105 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+from .instrumentation import RequestMetrics
+
+logger = logging.getLogger('properties.performance')
+
+
+class RequestTimingMiddleware:
+    """
+    Measure requests with ``RequestMetrics``, kept on ``request.request_metrics``.
+
+    A sample of them also gets a ``Server-Timing`` header and one JSON line
+    on ``properties.performance``. Requests with
+    ``REQUEST_METRICS_DUPLICATE_WARNING`` or more repeated queries are logged
+    as warnings along with the statements that repeat. While
+    ``MetricsMiddleware`` is in use every request is measured, since it
+    reads each request's query count from here.
+
+    Streaming responses are measured up to the point the view returns.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 0.1)
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', settings.DEBUG)
+        self.duplicate_warning = getattr(settings, 'REQUEST_METRICS_DUPLICATE_WARNING', 5)
+        self.measure_all = getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and not self.measure_all:
+            return self.get_response(request)
+
+        metrics = request.request_metrics = RequestMetrics()
+        token = metrics.activate()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate(token)
+
+        if sampled:
+            if self.server_timing:
+                response['Server-Timing'] = metrics.server_timing()
+            self.log(request, response, metrics)
+        return response
+
+    def log(self, request, response, metrics):
+        duplicates = metrics.duplicate_queries
+        level = logging.WARNING if duplicates >= self.duplicate_warning else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(metrics.elapsed * 1000, 1),
+            'db_queries': metrics.queries,
+            'db_ms': round(metrics.sql_time * 1000, 1),
+            'duplicate_queries': duplicates,
+            'template_ms': round(metrics.template_time * 1000, 1),
+        }
+        if level == logging.WARNING:
+            record['repeated'] = [{'sql': sql[:300], 'count': count} for sql, count in metrics.repeated()]
+        logger.log(level, json.dumps(record))
+
+
+class MetricsMiddleware:
+    """
+    Feed every request's latency, status and query count to metrics.py.
+
+    The query count comes from the ``RequestMetrics`` that
+    ``RequestTimingMiddleware``, placed below this one, attaches to the request.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        measured = getattr(request, 'request_metrics', None)
+        match = request.resolver_match
+        # Unmatched paths share one label to keep the series count bounded.
+        route = match.view_name if match else 'unmatched'
+        metrics.observe_request(
+            route, request.method, response.status_code, time.perf_counter() - start,
+            measured.queries if measured is not None else 0,
+        )
+        return response
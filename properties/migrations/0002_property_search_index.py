@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from properties import search
+
+
+def create_search_index(apps, schema_editor):
+    search.create_search_table(schema_editor.connection)
+    search.rebuild(using=schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_search_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
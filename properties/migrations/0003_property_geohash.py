@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:26
+
+from django.db import migrations, models
+
+from properties.geo import encode_geohash
+
+
+def backfill_geohash(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    pending = Property.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for property_obj in pending.only('id', 'latitude', 'longitude').iterator(chunk_size=2000):
+        property_obj.geohash = encode_geohash(property_obj.latitude, property_obj.longitude)
+        batch.append(property_obj)
+        if len(batch) >= 2000:
+            Property.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        Property.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0002_property_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+from properties import counters
+
+
+def backfill_counters(apps, schema_editor):
+    counters.reconcile(apps=apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='pending_inquiry_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
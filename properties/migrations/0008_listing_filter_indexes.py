@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_property_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='property',
+            name='properties__slug_4fd4e3_idx',
+        ),
+        migrations.AddIndex(
+            model_name='favoriteproperty',
+            index=models.Index(fields=['user', '-added_at', '-id'], name='favorite_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='property_active_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['listing_type', 'property_type', 'price'], name='property_active_type_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['listing_type', 'bedrooms', 'bathrooms'], name='property_active_rooms_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price'], name='property_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='property_owner_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertyinquiry',
+            index=models.Index(fields=['sender', '-created_at', '-id'], name='inquiry_sender_recent_idx'),
+        ),
+    ]
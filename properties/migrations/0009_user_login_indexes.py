@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+# auth_user belongs to django.contrib.auth, so its expression indexes are
+# created here through the schema editor rather than declared on the model.
+LOGIN_INDEXES = (
+    models.Index(Lower('username'), name='auth_user_username_lower_idx'),
+    models.Index(Lower('email'), name='auth_user_email_lower_idx'),
+)
+
+
+def _user_model(apps):
+    return apps.get_model(settings.AUTH_USER_MODEL)
+
+
+def add_login_indexes(apps, schema_editor):
+    user_model = _user_model(apps)
+    for index in LOGIN_INDEXES:
+        schema_editor.add_index(user_model, index)
+
+
+def remove_login_indexes(apps, schema_editor):
+    user_model = _user_model(apps)
+    for index in LOGIN_INDEXES:
+        schema_editor.remove_index(user_model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_listing_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(add_login_indexes, remove_login_indexes),
+    ]
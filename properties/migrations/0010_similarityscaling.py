@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_user_login_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityScaling',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_type', models.CharField(max_length=10, unique=True)),
+                ('means', models.JSONField()),
+                ('deviations', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
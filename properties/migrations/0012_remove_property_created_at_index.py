@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:39
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_cache_table'),
+    ]
+
+    operations = [
+        # Listing pages read the partial property_active_recent_idx instead.
+        migrations.RemoveIndex(
+            model_name='property',
+            name='properties__created_9ef325_idx',
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:42
+
+import django.db.models.deletion
+import properties.search
+from django.db import migrations, models
+
+from properties import search
+
+
+def rename_postgres_key(apps, schema_editor):
+    # PropertySearchEntry joins on "rowid", FTS5's key; PostgreSQL tables
+    # created before the model was added call it property_id.
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = 'property_id'",
+            [search.SEARCH_TABLE],
+        )
+        if cursor.fetchone():
+            cursor.execute(f"ALTER TABLE {search.SEARCH_TABLE} RENAME COLUMN property_id TO rowid")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_remove_property_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertySearchEntry',
+            fields=[
+                ('property', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='properties.property')),
+                ('document', properties.search.SearchDocumentField()),
+            ],
+            options={
+                'db_table': 'properties_property_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(rename_postgres_key, migrations.RunPython.noop),
+    ]
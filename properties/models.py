@@ -1,10 +1,39 @@
 
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q
 from django.contrib.auth.models import User
-from django.utils.text import slugify
 from django.core.validators import MinValueValidator, URLValidator
 from django.urls import reverse
-import uuid
+from django.utils import timezone
+
+from .counters import COUNTERS
+from .geo import encode_geohash
+from .search import SEARCH_TABLE, SearchDocumentField
+from .slugs import base_slug, next_free_slug, random_slug
+
+
+SLUG_ATTEMPTS = 3
+
+
+class PropertyQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_active=True)
+
+    def for_cards(self):
+        """Load everything a listing card renders in a fixed number of queries."""
+        processing = BackgroundJob.objects.filter(
+            property=OuterRef('pk'), kind='property_image', status__in=['pending', 'running']
+        )
+        return self.annotate(photos_processing=Exists(processing)).prefetch_related(cover_image_prefetch())
+
+
+def cover_image_prefetch(lookup='images'):
+    """Prefetch only the cover image of each property into ``cover_images``."""
+    return Prefetch(
+        lookup,
+        queryset=PropertyImage.objects.order_by('-is_primary', 'uploaded_at')[:1],
+        to_attr='cover_images',
+    )
 
 
 class Property(models.Model):
@@ -47,6 +76,7 @@ class Property(models.Model):
     postal_code = models.CharField(max_length=20, blank=True)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     
     # Details
     bedrooms = models.IntegerField(validators=[MinValueValidator(0)], null=True, blank=True)
@@ -78,45 +108,104 @@ class Property(models.Model):
     contact_phone = models.CharField(max_length=20, blank=True)
     contact_email = models.EmailField(blank=True)
 
+    # Maintained incrementally by signals; see properties/counters.py
+    photo_count = models.PositiveIntegerField(default=0, editable=False)
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+    pending_inquiry_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PropertyQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['slug']),
             models.Index(fields=['city', 'listing_type']),
-            models.Index(fields=['-created_at']),
+            # Listing pages: active rows only, in keyset (created_at, id) order
+            models.Index(
+                fields=['-created_at', '-id'], condition=Q(is_active=True), name='property_active_recent_idx',
+            ),
+            models.Index(
+                fields=['listing_type', 'property_type', 'price'], condition=Q(is_active=True),
+                name='property_active_type_price_idx',
+            ),
+            models.Index(
+                fields=['listing_type', 'bedrooms', 'bathrooms'], condition=Q(is_active=True),
+                name='property_active_rooms_idx',
+            ),
+            models.Index(fields=['price'], condition=Q(is_active=True), name='property_active_price_idx'),
+            # Dashboard: an owner's listings, newest first
+            models.Index(fields=['owner', '-created_at', '-id'], name='property_owner_recent_idx'),
         ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-            counter = 1
-            while Property.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        self.geohash = encode_geohash(self.latitude, self.longitude)
+        if self.pk is not None and not self._state.adding and kwargs.get('update_fields') is None:
+            # Never write back counters that may have moved since this
+            # instance was loaded.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTERS
+            ]
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        # A concurrent insert can claim the same slug between allocation and
+        # INSERT; retry inside a savepoint, then fall back to a random suffix.
+        using = kwargs.get('using') or router.db_for_write(Property, instance=self)
+        base = base_slug(self.title)
+        for attempt in range(SLUG_ATTEMPTS):
+            if attempt < SLUG_ATTEMPTS - 1:
+                self.slug = next_free_slug(Property.objects.using(using), base)
+            else:
+                self.slug = random_slug(base)
+            try:
+                with transaction.atomic(using=using):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if not Property.objects.using(using).filter(slug=self.slug).exists():
+                    raise
+        raise IntegrityError(f'Could not allocate a unique slug for "{self.title}".')
 
     def get_absolute_url(self):
         return reverse('property-detail', kwargs={'slug': self.slug})
 
     @property
     def image_count(self):
-        return self.images.count()
+        return self.photo_count
 
     @property
     def primary_image(self):
+        if hasattr(self, 'cover_images'):
+            return self.cover_images[0] if self.cover_images else None
         return self.images.first()
 
 
+class PropertySearchEntry(models.Model):
+    """
+    A listing's row in the full-text index. search.py creates and fills the
+    table; the model only lets listing querysets join it.
+    """
+
+    property = models.OneToOneField(
+        Property, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', db_constraint=False,
+        related_name='search_entry',
+    )
+    document = SearchDocumentField()
+
+    class Meta:
+        managed = False
+        db_table = SEARCH_TABLE
+
+
 class PropertyImage(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='properties/%Y/%m/%d/')
     is_primary = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # {"webp": {"320": "<storage name>", ...}, ...}; see properties/images.py
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ['-is_primary', 'uploaded_at']
@@ -126,7 +215,10 @@ class PropertyImage(models.Model):
 
     def save(self, *args, **kwargs):
         if self.is_primary:
-            PropertyImage.objects.filter(property=self.property, is_primary=True).update(is_primary=False)
+            others = PropertyImage.objects.filter(property=self.property, is_primary=True)
+            if self.pk:
+                others = others.exclude(pk=self.pk)
+            others.update(is_primary=False)
         super().save(*args, **kwargs)
 
 
@@ -156,6 +248,7 @@ class PropertyInquiry(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('property', 'sender')
+        indexes = [models.Index(fields=['sender', '-created_at', '-id'], name='inquiry_sender_recent_idx')]
 
     def __str__(self):
         return f"Inquiry for {self.property.title} by {self.sender.get_full_name() or self.sender.username}"
@@ -169,6 +262,61 @@ class FavoriteProperty(models.Model):
     class Meta:
         unique_together = ('user', 'property')
         ordering = ['-added_at']
+        indexes = [models.Index(fields=['user', '-added_at', '-id'], name='favorite_user_recent_idx')]
 
     def __str__(self):
         return f"{self.user.username} favorited {self.property.title}"
+
+
+class SimilarProperty(models.Model):
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='neighbours')
+    similar = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='neighbour_of')
+    rank = models.PositiveSmallIntegerField()
+    distance = models.FloatField()
+
+    class Meta:
+        ordering = ['property', 'rank']
+        unique_together = ('property', 'rank')
+
+    def __str__(self):
+        return f"{self.similar_id} is similar to {self.property_id} (#{self.rank + 1})"
+
+
+class SimilarityScaling(models.Model):
+    """Feature standardization of one listing type, saved by the last full rebuild."""
+
+    listing_type = models.CharField(max_length=10, unique=True)
+    means = models.JSONField()
+    deviations = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Similarity scaling for {self.listing_type}"
+
+
+class BackgroundJob(models.Model):
+    """A unit of deferred work, run by the ``process_jobs`` worker."""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.kind} job #{self.pk} ({self.status})"
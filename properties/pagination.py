@@ -0,0 +1,133 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of ``OFFSET``/``COUNT`` this seeks past the last row shown using the
+ordering keys, so every page costs one indexed range read regardless of how
+deep it is. Cursors are opaque URL-safe tokens encoding the boundary row.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` in descending order of ``keys``, the last of which
+    must be unique (normally ``id``). Keys may be model fields or
+    annotations already present on the queryset; ``.values()`` querysets
+    must include them.
+    """
+
+    def __init__(self, queryset, per_page, keys=('created_at', 'id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.keys = tuple(keys)
+
+    def get_page(self, cursor=None):
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            direction, values = 'next', None
+        else:
+            direction, values = position
+
+        if direction == 'next':
+            queryset = self.queryset.order_by(*['-%s' % key for key in self.keys])
+            if values is not None:
+                queryset = queryset.filter(self._seek(values, 'lt'))
+        else:
+            queryset = self.queryset.order_by(*self.keys).filter(self._seek(values, 'gt'))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'previous':
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+        if direction == 'next':
+            has_next, has_previous = has_more, values is not None
+        else:
+            has_next, has_previous = True, has_more
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor('next', rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor('previous', rows[0]) if has_previous else None,
+        )
+
+    def _seek(self, values, lookup):
+        # (a, b, c) < (x, y, z) expanded for databases without row values.
+        condition = Q()
+        for index, key in enumerate(self.keys):
+            term = Q(**{'%s__%s' % (key, lookup): values[index]})
+            for previous_key, value in zip(self.keys[:index], values):
+                term &= Q(**{previous_key: value})
+            condition |= term
+        return condition
+
+    def encode_cursor(self, direction, obj):
+        values = []
+        for key in self.keys:
+            value = obj[key] if isinstance(obj, dict) else getattr(obj, key)
+            values.append(value.isoformat() if isinstance(value, datetime) else value)
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('next', 'previous') or len(values) != len(self.keys):
+                return None
+            return direction, [self._to_python(key, value) for key, value in zip(self.keys, values)]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            return None
+
+    def _field(self, key):
+        try:
+            return self.queryset.model._meta.get_field(key)
+        except FieldDoesNotExist:
+            # Annotations over columns (F('relation__field')) know their type; raw SQL may not.
+            annotation = self.queryset.query.annotations.get(key)
+            return getattr(annotation, '_output_field_or_none', None)
+
+    def _to_python(self, key, value):
+        field = self._field(key)
+        if field is None:
+            if not isinstance(value, (int, float)):
+                raise ValueError('Invalid cursor value for %s' % key)
+            return value
+        value = field.to_python(value)
+        if value is None:
+            raise ValueError('Invalid cursor value for %s' % key)
+        return value
@@ -0,0 +1,63 @@
+"""
+Per-route SQL query budgets, checked by properties/tests/test_query_budgets.py
+and the check_query_budgets command.
+"""
+
+from django.urls import reverse
+
+# route -> (method, URL for the fixture, {role: (max queries, max duplicate queries)})
+#
+# Measured with a cold cache against the fixed dataset built by
+# QueryBudgetTests.setUpTestData() in properties/tests/test_query_budgets.py.
+# Pages listing cards show 12 or more of them, so a per-card query blows well
+# past both limits.
+BUDGETS = {
+    'home': ('GET', lambda f: reverse('home'), {'anonymous': (4, 0), 'user': (7, 0)}),
+    'property-list': ('GET', lambda f: reverse('property-list'), {'anonymous': (5, 0), 'user': (8, 0)}),
+    'property-feed': ('GET', lambda f: reverse('property-feed'), {'anonymous': (3, 0), 'user': (3, 0)}),
+    'property-map': ('GET', lambda f: reverse('property-map'), {'anonymous': (1, 0), 'user': (1, 0)}),
+    'property-detail': ('GET', lambda f: reverse('property-detail', args=[f.other_listing.slug]),
+                        {'anonymous': (6, 0), 'user': (9, 0)}),
+    'signup': ('GET', lambda f: reverse('signup'), {'anonymous': (0, 0), 'user': (2, 0)}),
+    'login': ('GET', lambda f: reverse('login'), {'anonymous': (0, 0), 'user': (2, 0)}),
+    'logout': ('GET', lambda f: reverse('logout'), {'anonymous': (0, 0), 'user': (4, 0)}),
+    'password_reset': ('GET', lambda f: reverse('password_reset'), {'anonymous': (0, 0), 'user': (2, 0)}),
+    'password_reset_done': ('GET', lambda f: reverse('password_reset_done'), {'anonymous': (0, 0), 'user': (2, 0)}),
+    # Looks the user up by uid and stores the token in the session before redirecting.
+    'password_reset_confirm': ('GET', lambda f: reverse('password_reset_confirm', args=f.reset_args),
+                               {'anonymous': (3, 0), 'user': (3, 0)}),
+    'password_reset_complete': ('GET', lambda f: reverse('password_reset_complete'),
+                                {'anonymous': (0, 0), 'user': (2, 0)}),
+    'post-property': ('GET', lambda f: reverse('post-property'), {'anonymous': (0, 0), 'user': (2, 0)}),
+    'edit-property': ('GET', lambda f: reverse('edit-property', args=[f.listing.slug]),
+                      {'anonymous': (0, 0), 'user': (5, 0)}),
+    'delete-property': ('GET', lambda f: reverse('delete-property', args=[f.listing.slug]),
+                        {'anonymous': (0, 0), 'user': (3, 0)}),
+    # Deletes the image it is given, so it gets a fresh one each time.
+    'delete-image': ('GET', lambda f: reverse('delete-image', args=[f.new_image().pk]),
+                     {'anonymous': (0, 0), 'user': (7, 0)}),
+    'contact-property': ('GET', lambda f: reverse('contact-property', args=[f.other_listing.slug]),
+                         {'anonymous': (0, 0), 'user': (4, 0)}),
+    'my-inquiries': ('GET', lambda f: reverse('my-inquiries'), {'anonymous': (0, 0), 'user': (3, 0)}),
+    'manage-inquiries': ('GET', lambda f: reverse('manage-inquiries'), {'anonymous': (0, 0), 'user': (3, 0)}),
+    'inquiry-detail': ('GET', lambda f: reverse('inquiry-detail', args=[f.inquiry.pk]),
+                       {'anonymous': (0, 0), 'user': (4, 0)}),
+    'saved-properties': ('GET', lambda f: reverse('saved-properties'), {'anonymous': (0, 0), 'user': (4, 0)}),
+    # DELETE, then INSERT ... SELECT when nothing was deleted, then the counter UPDATE.
+    'toggle-favorite': ('POST', lambda f: reverse('toggle-favorite', args=[f.other_listing.slug]),
+                        {'anonymous': (0, 0), 'user': (5, 0)}),
+    'favorites-batch': ('GET', lambda f: reverse('favorites-batch') + '?ids=' + f.listing_ids,
+                        {'anonymous': (0, 0), 'user': (3, 0)}),
+    'export-properties': ('GET', lambda f: reverse('export-properties'), {'anonymous': (0, 0), 'user': (3, 0)}),
+    'export-inquiries': ('GET', lambda f: reverse('export-inquiries'), {'anonymous': (0, 0), 'user': (3, 0)}),
+    'api-listings': ('GET', lambda f: reverse('api-listings'), {'anonymous': (3, 0), 'user': (3, 0)}),
+    'api-listing-detail': ('GET', lambda f: reverse('api-listing-detail', args=[f.other_listing.slug]),
+                           {'anonymous': (2, 0), 'user': (2, 0)}),
+    'api-listing-images': ('GET', lambda f: reverse('api-listing-images', args=[f.other_listing.slug]),
+                           {'anonymous': (2, 0), 'user': (2, 0)}),
+    'api-facets': ('GET', lambda f: reverse('api-facets'), {'anonymous': (1, 0), 'user': (1, 0)}),
+    'dashboard': ('GET', lambda f: reverse('dashboard'), {'anonymous': (0, 0), 'user': (6, 0)}),
+    'profile': ('GET', lambda f: reverse('profile'), {'anonymous': (0, 0), 'user': (2, 0)}),
+    'metrics': ('GET', lambda f: reverse('metrics'), {'anonymous': (0, 0), 'user': (2, 0)}),
+}
+ROLES = ('anonymous', 'user')
@@ -0,0 +1,255 @@
+"""
+Precomputed "similar properties".
+
+Every active listing is turned into a weighted, standardized feature vector
+(log price and area, rooms, amenities, coordinates, property type) and its
+k nearest neighbours within the same listing type are stored in
+``SimilarProperty``, so the detail page reads them with one indexed lookup.
+
+``rebuild`` recomputes everything in row blocks and stores the
+standardization of each listing type in ``SimilarityScaling``.
+``refresh_property`` runs as a background job after a listing is saved: it
+compares the listing, scaled with the stored parameters, against nearby
+listings of the same type only (same city or within
+``SIMILAR_PROPERTIES_RADIUS_KM``), replaces its own neighbour list and
+merges it into the lists it now belongs to in a fixed number of queries.
+Stale entries for deactivated listings are filtered out when read and
+dropped at the next rebuild.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import geo
+from .models import Property, SimilarityScaling, SimilarProperty
+
+NUMERIC_FEATURES = (
+    ('price', 3.0),
+    ('area', 2.0),
+    ('bedrooms', 1.5),
+    ('bathrooms', 1.0),
+    ('latitude', 2.0),
+    ('longitude', 2.0),
+)
+AMENITY_FEATURES = ('is_furnished', 'has_parking', 'has_balcony', 'has_garden', 'has_pool', 'has_gym')
+AMENITY_WEIGHT = 0.5
+PROPERTY_TYPE_WEIGHT = 2.0
+LOG_SCALED = ('price', 'area')
+FEATURE_FIELDS = [name for name, _ in NUMERIC_FEATURES] + list(AMENITY_FEATURES) + ['property_type']
+
+
+def neighbour_count():
+    return getattr(settings, 'SIMILAR_PROPERTIES_COUNT', 8)
+
+
+def block_rows(listings):
+    """Rows per distance block, so one block of float64 distances fits the memory cap."""
+    cap = getattr(settings, 'SIMILAR_PROPERTIES_BLOCK_BYTES', 64 * 1024 * 1024)
+    return max(1, cap // (8 * max(listings, 1)))
+
+
+def _feature_rows(queryset):
+    return list(queryset.order_by('id').values_list('id', *FEATURE_FIELDS))
+
+
+def _numeric(rows):
+    numeric = np.array(
+        [[np.nan if value is None else float(value) for value in row[1:1 + len(NUMERIC_FEATURES)]] for row in rows],
+        dtype=float,
+    )
+    for index, (name, _) in enumerate(NUMERIC_FEATURES):
+        if name in LOG_SCALED:
+            numeric[:, index] = np.log1p(np.clip(numeric[:, index], 0, None))
+    return numeric
+
+
+def fit_scaling(rows):
+    """(means, deviations) standardizing the numeric features of ``rows``."""
+    numeric = _numeric(rows)
+    # Missing values sit at the column mean so they neither attract nor repel.
+    means = np.nanmean(np.where(np.isnan(numeric).all(axis=0), 0.0, numeric), axis=0)
+    deviations = np.where(np.isnan(numeric), means, numeric).std(axis=0)
+    deviations[deviations == 0] = 1.0
+    return means, deviations
+
+
+def feature_matrix(rows, means, deviations):
+    numeric = _numeric(rows)
+    numeric = np.where(np.isnan(numeric), means, numeric)
+    numeric = (numeric - means) / deviations
+    numeric *= np.array([weight for _, weight in NUMERIC_FEATURES])
+
+    amenity_start = 1 + len(NUMERIC_FEATURES)
+    amenities = np.array(
+        [row[amenity_start:amenity_start + len(AMENITY_FEATURES)] for row in rows], dtype=float
+    ) * AMENITY_WEIGHT
+
+    type_names = [choice for choice, _ in Property.PROPERTY_TYPE_CHOICES]
+    types = np.zeros((len(rows), len(type_names)))
+    for index, row in enumerate(rows):
+        if row[-1] in type_names:
+            types[index, type_names.index(row[-1])] = PROPERTY_TYPE_WEIGHT
+
+    return np.hstack([numeric, amenities, types])
+
+
+def load_features(listing_type):
+    """Return (ids, matrix, (means, deviations)) for the active listings of one listing type."""
+    rows = _feature_rows(Property.objects.active().filter(listing_type=listing_type))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0)), None
+    scaling = fit_scaling(rows)
+    return np.array([row[0] for row in rows], dtype=np.int64), feature_matrix(rows, *scaling), scaling
+
+
+def save_scaling(listing_type, means, deviations):
+    SimilarityScaling.objects.update_or_create(
+        listing_type=listing_type, defaults={'means': means.tolist(), 'deviations': deviations.tolist()},
+    )
+
+
+def stored_scaling(listing_type):
+    """The rebuild's scaling for ``listing_type``, fitting and saving it if there is none."""
+    scaling = SimilarityScaling.objects.filter(listing_type=listing_type).values('means', 'deviations').first()
+    if scaling:
+        return np.array(scaling['means']), np.array(scaling['deviations'])
+    rows = _feature_rows(Property.objects.active().filter(listing_type=listing_type))
+    if not rows:
+        return None
+    means, deviations = fit_scaling(rows)
+    save_scaling(listing_type, means, deviations)
+    return means, deviations
+
+
+def _top_k(distances, k):
+    k = min(k, distances.shape[1])
+    if k == 0:
+        return np.empty((distances.shape[0], 0), dtype=np.int64)
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1)
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+def _neighbour_rows(property_id, neighbour_ids, distances):
+    return [
+        SimilarProperty(property_id=property_id, similar_id=similar_id, rank=rank, distance=distance)
+        for rank, (similar_id, distance) in enumerate(zip(neighbour_ids, distances))
+        if np.isfinite(distance)
+    ]
+
+
+def rebuild(batch_size=None, k=None):
+    """
+    Recompute every neighbour list; returns the number of listings processed.
+
+    Distances are computed ``batch_size`` rows at a time against every listing
+    of the type, by default as many rows as ``SIMILAR_PROPERTIES_BLOCK_BYTES``
+    allows.
+    """
+    k = k or neighbour_count()
+    total = 0
+    with transaction.atomic():
+        SimilarProperty.objects.all().delete()
+        for listing_type, _ in Property.LISTING_TYPE_CHOICES:
+            ids, features, scaling = load_features(listing_type)
+            if scaling is not None:
+                save_scaling(listing_type, *scaling)
+            if len(ids) < 2:
+                continue
+            squared = (features ** 2).sum(axis=1)
+            rows_per_block = batch_size or block_rows(len(ids))
+            for start in range(0, len(ids), rows_per_block):
+                block = features[start:start + rows_per_block]
+                # In place, so the block's distance matrix is the only one allocated.
+                distances = block @ features.T
+                distances *= -2
+                distances += squared[start:start + rows_per_block, None]
+                distances += squared[None, :]
+                np.maximum(distances, 0, out=distances)
+                rows = np.arange(len(block))
+                distances[rows, rows + start] = np.inf
+                nearest = _top_k(distances, k)
+                objects = []
+                for row, columns in enumerate(nearest):
+                    objects.extend(_neighbour_rows(
+                        int(ids[start + row]),
+                        ids[columns].tolist(),
+                        np.sqrt(distances[row, columns]).tolist(),
+                    ))
+                SimilarProperty.objects.bulk_create(objects, batch_size=2000)
+                total += len(block)
+    return total
+
+
+def candidates(listing):
+    """Active listings of the same type near ``listing``: same city or within the radius."""
+    nearby = Q(city=listing['city'])
+    if listing['latitude'] is not None and listing['longitude'] is not None:
+        radius = getattr(settings, 'SIMILAR_PROPERTIES_RADIUS_KM', 25)
+        nearby |= geo.radius_prefilter(listing['latitude'], listing['longitude'], radius)
+    limit = getattr(settings, 'SIMILAR_PROPERTIES_MAX_CANDIDATES', 5000)
+    return Property.objects.active().filter(nearby, listing_type=listing['listing_type'])[:limit]
+
+
+def refresh_property(property_id, k=None):
+    """Incrementally update neighbour lists after one listing changed."""
+    k = k or neighbour_count()
+    listing = (
+        Property.objects.filter(pk=property_id)
+        .values('listing_type', 'is_active', 'city', 'latitude', 'longitude').first()
+    )
+    with transaction.atomic():
+        SimilarProperty.objects.filter(property_id=property_id).delete()
+        if listing is None or not listing['is_active']:
+            SimilarProperty.objects.filter(similar_id=property_id).delete()
+            return
+        scaling = stored_scaling(listing['listing_type'])
+        rows = _feature_rows(Property.objects.filter(Q(pk=property_id) | Q(pk__in=candidates(listing))))
+        if scaling is None or len(rows) < 2:
+            return
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        features = feature_matrix(rows, *scaling)
+        position = int(np.searchsorted(ids, property_id))
+
+        distances = np.sqrt(((features - features[position]) ** 2).sum(axis=1))
+        distances[position] = np.inf
+        nearest = _top_k(distances[None, :], k)[0]
+        SimilarProperty.objects.bulk_create(
+            _neighbour_rows(property_id, ids[nearest].tolist(), distances[nearest].tolist())
+        )
+
+        # Lists this listing now belongs in (it beats their worst neighbour, or
+        # they are not full) and lists already holding it are rewritten together.
+        distance_to = dict(zip(ids.tolist(), distances.tolist()))
+        del distance_to[property_id]
+        full = set()
+        holding = set()
+        for other_id, similar_id, rank, distance in SimilarProperty.objects.filter(
+            Q(property_id__in=list(distance_to), rank=k - 1) | Q(similar_id=property_id)
+        ).values_list('property_id', 'similar_id', 'rank', 'distance'):
+            if similar_id == property_id:
+                holding.add(other_id)
+            if rank == k - 1 and distance_to.get(other_id, np.inf) >= distance:
+                full.add(other_id)
+        affected = holding | {other_id for other_id in distance_to if other_id not in full}
+        if not affected:
+            return
+
+        lists = defaultdict(list)
+        for other_id, similar_id, distance in SimilarProperty.objects.filter(
+            property_id__in=affected
+        ).exclude(similar_id=property_id).values_list('property_id', 'similar_id', 'distance'):
+            lists[other_id].append((similar_id, distance))
+        objects = []
+        for other_id in affected:
+            merged = lists[other_id]
+            if other_id in distance_to:
+                merged.append((property_id, distance_to[other_id]))
+            merged = sorted(merged, key=lambda item: item[1])[:k]
+            objects.extend(_neighbour_rows(other_id, [item[0] for item in merged], [item[1] for item in merged]))
+        SimilarProperty.objects.filter(property_id__in=affected).delete()
+        SimilarProperty.objects.bulk_create(objects, batch_size=2000)
@@ -0,0 +1,210 @@
+"""
+Full-text search over property listings.
+
+Listings are indexed into a side table keyed by property id: an FTS5 virtual
+table on SQLite and a weighted ``tsvector`` column with a GIN index on
+PostgreSQL. Other databases fall back to ``icontains`` filtering. The table is
+mapped by the unmanaged ``PropertySearchEntry`` model, so searches are plain
+ORM joins that compose with ``count()``, ``values()`` and keyset filters.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import F, FloatField, Func, Lookup, Q, TextField
+
+SEARCH_TABLE = 'properties_property_search'
+PROPERTY_TABLE = 'properties_property'
+MAX_TERMS = 8
+
+# Column weights: title matches rank above location/city, which rank above
+# the free-text description.
+SQLITE_WEIGHTS = (10.0, 1.0, 4.0, 4.0)
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(city, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def is_supported(connection):
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def create_search_table(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                "title, description, location, city, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                f"rowid bigint PRIMARY KEY REFERENCES {PROPERTY_TABLE} (id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx "
+                f"ON {SEARCH_TABLE} USING GIN (document)"
+            )
+
+
+def drop_search_table(connection):
+    if is_supported(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def index_properties(ids, using='default'):
+    """(Re)index the given property ids, dropping rows for deleted ones."""
+    ids = list(ids)
+    connection = connections[using]
+    if not ids or not is_supported(connection):
+        return
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", ids)
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, description, location, city) "
+                f"SELECT id, title, description, location, city FROM {PROPERTY_TABLE} "
+                f"WHERE id IN ({placeholders})",
+                ids,
+            )
+        else:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", ids)
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, document) "
+                f"SELECT id, {POSTGRES_DOCUMENT} FROM {PROPERTY_TABLE} "
+                f"WHERE id IN ({placeholders})",
+                ids,
+            )
+
+
+def remove_properties(ids, using='default'):
+    ids = list(ids)
+    connection = connections[using]
+    if not ids or not is_supported(connection):
+        return
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", ids)
+
+
+def rebuild(batch_size=2000, using='default'):
+    """Rebuild the whole index in id-ordered batches; returns rows indexed."""
+    connection = connections[using]
+    if not is_supported(connection):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    total = 0
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM {PROPERTY_TABLE} WHERE id > %s ORDER BY id LIMIT %s",
+                [last_id, batch_size],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            break
+        index_properties(ids, using=using)
+        total += len(ids)
+        last_id = ids[-1]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return total
+
+
+class SearchDocumentField(TextField):
+    """
+    The indexed document of a ``PropertySearchEntry``: the ``tsvector`` column
+    on PostgreSQL. On SQLite, FTS5 matches and ranks through the hidden column
+    named after the table instead, which ``Match`` and ``SearchRank`` use.
+    """
+
+
+def _document_sql(col, compiler, connection):
+    if connection.vendor == 'sqlite':
+        qn = compiler.quote_name_unless_alias
+        return f'{qn(col.alias)}.{qn(SEARCH_TABLE)}', []
+    return compiler.compile(col)
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    """``search_entry__document__match=<query>``, the query as built by ``_match_query``."""
+
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        document, params = _document_sql(self.lhs, compiler, connection)
+        query, query_params = self.process_rhs(compiler, connection)
+        if connection.vendor == 'sqlite':
+            return f'{document} MATCH {query}', params + query_params
+        return f"{document} @@ to_tsquery('simple', {query})", params + query_params
+
+
+class SearchRank(Func):
+    """Relevance of a matched document; higher is more relevant."""
+
+    output_field = FloatField()
+
+    def __init__(self, document, query):
+        super().__init__(document, output_field=FloatField())
+        self.query = query
+
+    def as_sql(self, compiler, connection):
+        document, params = _document_sql(self.source_expressions[0], compiler, connection)
+        if connection.vendor == 'sqlite':
+            weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+            return f'-bm25({document}, {weights})', params
+        return f"ts_rank({document}, to_tsquery('simple', %s))", params + [self.query]
+
+
+def parse_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _match_query(terms, connection):
+    # Every term must match, each also as a prefix.
+    if connection.vendor == 'sqlite':
+        return ' '.join('"%s"*' % term for term in terms)
+    return ' & '.join('%s:*' % term for term in terms)
+
+
+def search_properties(queryset, query, rank=True):
+    """
+    Restrict ``queryset`` to listings matching every term of ``query`` (each
+    term also matches as a prefix) and, if ``rank``, annotate it with
+    ``search_rank``, where higher is more relevant. The index is joined once,
+    so the rank is computed in the same pass as the match; querysets that are
+    only counted should pass ``rank=False``.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return queryset
+    connection = connections[queryset.db]
+    if not is_supported(connection):
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(title__icontains=term) |
+                Q(description__icontains=term) |
+                Q(location__icontains=term) |
+                Q(city__icontains=term)
+            )
+        return queryset.filter(condition)
+    match = _match_query(terms, connection)
+    # The filter makes the join INNER, which FTS5 needs for MATCH; the rank
+    # reuses that join.
+    queryset = queryset.filter(search_entry__document__match=match)
+    if rank:
+        queryset = queryset.annotate(search_rank=SearchRank(F('search_entry__document'), match))
+    return queryset
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counters, images, jobs, search
+from .caching import bump_listings_version
+from .models import BackgroundJob, FavoriteProperty, Property, PropertyImage, PropertyInquiry
+
+
+@receiver(post_save, sender=Property)
+def index_property(sender, instance, raw=False, using='default', **kwargs):
+    if not raw:
+        search.index_properties([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Property)
+def unindex_property(sender, instance, using='default', **kwargs):
+    search.remove_properties([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_listing_caches(sender, **kwargs):
+    bump_listings_version()
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+def touch_property_on_image_change(sender, instance, signal, created=False, raw=False, **kwargs):
+    # Card fragments are keyed on updated_at, so a new cover image must
+    # advance it even though the listing row itself did not change.
+    if raw:
+        return
+    if created or signal is post_delete:
+        counters.adjust(instance.property_id, 'photo_count', 1 if created else -1, updated_at=timezone.now())
+    else:
+        Property.objects.filter(pk=instance.property_id).update(updated_at=timezone.now())
+    bump_listings_version()
+
+
+@receiver(post_save, sender=FavoriteProperty)
+def count_favorite(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.adjust(instance.property_id, 'favorite_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteProperty)
+def uncount_favorite(sender, instance, **kwargs):
+    counters.adjust(instance.property_id, 'favorite_count', -1)
+
+
+@receiver(post_init, sender=PropertyInquiry)
+def remember_inquiry_status(sender, instance, **kwargs):
+    instance._counted_pending = instance.pk is not None and instance.status == 'pending'
+
+
+@receiver(post_save, sender=PropertyInquiry)
+def count_pending_inquiry(sender, instance, raw=False, **kwargs):
+    pending = instance.status == 'pending'
+    if not raw and pending != instance._counted_pending:
+        counters.adjust(instance.property_id, 'pending_inquiry_count', 1 if pending else -1)
+    instance._counted_pending = pending
+
+
+@receiver(post_delete, sender=PropertyInquiry)
+def uncount_pending_inquiry(sender, instance, **kwargs):
+    if instance._counted_pending:
+        counters.adjust(instance.property_id, 'pending_inquiry_count', -1)
+
+
+@receiver(post_save, sender=Property)
+def refresh_similar_properties(sender, instance, raw=False, **kwargs):
+    if not raw and getattr(settings, 'SIMILAR_PROPERTIES_REFRESH_ON_SAVE', True):
+        transaction.on_commit(lambda: jobs.enqueue_similar_refresh(instance))
+
+
+@receiver(post_save, sender=PropertyImage)
+def generate_image_derivatives(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and getattr(settings, 'IMAGE_DERIVATIVES_ON_UPLOAD', True):
+        transaction.on_commit(lambda: jobs.enqueue(
+            jobs.IMAGE_DERIVATIVES, {'image_id': instance.pk}, property_obj=instance.property,
+        ))
+
+
+@receiver(post_delete, sender=PropertyImage)
+def delete_image_derivatives(sender, instance, **kwargs):
+    images.delete_derivatives(instance)
+
+
+@receiver(post_delete, sender=BackgroundJob)
+def delete_spooled_upload(sender, instance, **kwargs):
+    # Finished jobs, and jobs deleted with their listing, take their upload along.
+    transaction.on_commit(lambda: jobs.discard_upload(instance))
@@ -0,0 +1,82 @@
+"""
+Unique slug allocation.
+
+Same-titled listings get ``<base>``, ``<base>-1``, ``<base>-2`` ... The next
+free suffix is found with a single indexed range query over the slug column
+rather than probing each candidate in turn.
+"""
+
+import re
+import uuid
+
+from django.db.models import Q
+from django.db.models.functions import Length
+from django.utils.text import slugify
+
+# SlugField defaults to 50 characters; leave room for "-<suffix>".
+MAX_BASE_LENGTH = 40
+BULK_QUERY_SIZE = 200
+
+
+def base_slug(title):
+    return slugify(title)[:MAX_BASE_LENGTH].strip('-') or 'property'
+
+
+def _family(base):
+    # "<base>" itself plus every "<base>-<digits>". The range bounds keep the
+    # lookup on the slug index; "." is the character right after "-".
+    return Q(slug=base) | Q(
+        slug__gt=base + '-',
+        slug__lt=base + '.',
+        slug__regex=r'^%s-[0-9]+$' % re.escape(base),
+    )
+
+
+def _suffix(base, slug):
+    if slug == base:
+        return 0
+    return int(slug[len(base) + 1:])
+
+
+def next_free_slug(queryset, base):
+    """The first unused slug in ``base``'s family, in one query."""
+    # The numerically largest suffix is the longest, then lexically largest, slug.
+    latest = (
+        queryset.filter(_family(base))
+        .annotate(slug_length=Length('slug'))
+        .order_by('-slug_length', '-slug')
+        .values_list('slug', flat=True)
+        .first()
+    )
+    if latest is None:
+        return base
+    return f'{base}-{_suffix(base, latest) + 1}'
+
+
+def random_slug(base):
+    return f'{base}-{uuid.uuid4().hex[:8]}'
+
+
+def allocate_slugs(queryset, titles):
+    """Unique slugs for a batch of new titles, in the same order."""
+    bases = [base_slug(title) for title in titles]
+    next_suffix = {}
+    distinct = sorted(set(bases))
+    for start in range(0, len(distinct), BULK_QUERY_SIZE):
+        chunk = distinct[start:start + BULK_QUERY_SIZE]
+        condition = Q()
+        for base in chunk:
+            condition |= _family(base)
+        members = set(chunk)
+        for slug in queryset.filter(condition).values_list('slug', flat=True).iterator():
+            prefix, _, suffix = slug.rpartition('-')
+            for base in (slug, prefix if suffix.isdigit() else None):
+                if base in members:
+                    next_suffix[base] = max(next_suffix.get(base, 0), _suffix(base, slug) + 1)
+
+    slugs = []
+    for base in bases:
+        suffix = next_suffix.get(base, 0)
+        slugs.append(f'{base}-{suffix}' if suffix else base)
+        next_suffix[base] = suffix + 1
+    return slugs
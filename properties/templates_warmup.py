@@ -0,0 +1,57 @@
+"""
+Compile the project's templates ahead of the first request.
+
+TEMPLATES uses the cached loader, which parses each template once per
+process and keeps the compiled result in memory. ``warm_templates()`` walks
+the project's template directories and loads every template through that
+loader, so a freshly forked worker does not pay the parse cost while serving
+traffic. It is called from ``realestate/wsgi.py`` when ``TEMPLATE_WARMUP``
+is set. Templates of installed third-party apps are left to load lazily.
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import Engine, TemplateSyntaxError
+
+logger = logging.getLogger(__name__)
+
+
+def project_template_dirs(engine):
+    base = Path(settings.BASE_DIR).resolve()
+    loaders = []
+    for loader in engine.template_loaders:
+        loaders.extend(getattr(loader, 'loaders', [loader]))
+    for loader in loaders:
+        for directory in loader.get_dirs():
+            directory = Path(directory).resolve()
+            if directory.is_dir() and directory.is_relative_to(base):
+                yield directory
+
+
+def template_names(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [name for name in dirs if not name.startswith('.')]
+        for filename in files:
+            if filename.endswith(('.html', '.txt')):
+                yield Path(root, filename).relative_to(directory).as_posix()
+
+
+def warm_templates():
+    """Compile every project template; return how many were loaded."""
+    engine = Engine.get_default()
+    started = time.perf_counter()
+    names = sorted({name for directory in project_template_dirs(engine) for name in template_names(directory)})
+    loaded = 0
+    for name in names:
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            logger.exception('Template %s failed to compile during warm-up', name)
+        else:
+            loaded += 1
+    logger.info('Compiled %d templates in %.1f ms', loaded, (time.perf_counter() - started) * 1000)
+    return loaded
@@ -0,0 +1,41 @@
+from django import template
+from django.urls import reverse
+
+register = template.Library()
+
+SLUG_PLACEHOLDER = 'property-card-slug'
+
+
+def _url_patterns(context):
+    # Reverse once per page render; slugs are ASCII and need no quoting.
+    patterns = context.render_context.get(SLUG_PLACEHOLDER)
+    if patterns is None:
+        patterns = context.render_context[SLUG_PLACEHOLDER] = (
+            reverse('property-detail', args=[SLUG_PLACEHOLDER]).replace(SLUG_PLACEHOLDER, '{}'),
+            reverse('contact-property', args=[SLUG_PLACEHOLDER]).replace(SLUG_PLACEHOLDER, '{}'),
+        )
+    return patterns
+
+
+@register.inclusion_tag('properties/partials/property_card.html', takes_context=True)
+def property_card(context, property, favorite=None):
+    """
+    Render the listing card shared by the home, browse and saved pages.
+
+    The partial is compiled once and rendered against a context holding only
+    what the card uses rather than the whole page context. Favorites come
+    from ``user_favorites`` unless ``favorite`` says otherwise.
+    """
+    user = context.get('user')
+    signed_in = user is not None and user.is_authenticated
+    if favorite is None:
+        favorite = property.id in context.get('user_favorites', ())
+    detail_url, contact_url = _url_patterns(context)
+    return {
+        'property': property,
+        'signed_in': signed_in,
+        'favorite': favorite,
+        'can_contact': signed_in and user.id != property.owner_id,
+        'detail_url': detail_url.format(property.slug),
+        'contact_url': contact_url.format(property.slug),
+    }
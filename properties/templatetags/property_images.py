@@ -0,0 +1,43 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from properties.images import MIME_TYPES
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 576px) 100vw, (max-width: 992px) 50vw, 33vw'
+
+
+def _srcset(storage, widths):
+    return ', '.join(
+        f'{storage.url(name)} {width}w'
+        for width, name in sorted(widths.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def responsive_image(image, alt='', css_class='', sizes=DEFAULT_SIZES):
+    """
+    Render a PropertyImage as a <picture> with AVIF/WebP/JPEG srcsets, or as
+    a plain <img> of the original until its derivatives exist.
+    """
+    if not image:
+        return ''
+    variants = image.variants or {}
+    if not variants.get('jpeg'):
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', image.image.url, alt, css_class)
+
+    storage = image.image.storage
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (MIME_TYPES[name], _srcset(storage, variants[name]), sizes)
+            for name in ('avif', 'webp') if variants.get(name)
+        ),
+    )
+    jpeg = variants['jpeg']
+    fallback = jpeg[min(jpeg, key=lambda width: abs(int(width) - 640))]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        sources, storage.url(fallback), _srcset(storage, jpeg), sizes, alt, css_class,
+    )
@@ -0,0 +1,29 @@
+from itertools import count
+
+from django.contrib.auth.models import User
+
+from properties.models import Property
+
+_sequence = count(1)
+
+
+def make_user(username=None, **fields):
+    username = username or f'user{next(_sequence)}'
+    fields.setdefault('email', f'{username}@example.com')
+    return User.objects.create_user(username=username, password=fields.pop('password', 'secret-pass-123'), **fields)
+
+
+def make_property(owner, **fields):
+    """A saved listing with every required field filled in."""
+    values = {
+        'title': f'Listing {next(_sequence)}',
+        'description': 'A listing.',
+        'property_type': 'apartment',
+        'listing_type': 'sale',
+        'location': '1 Main Street',
+        'city': 'Pune',
+        'area': 900,
+        'price': 100000,
+    }
+    values.update(fields)
+    return Property.objects.create(owner=owner, **values)
@@ -0,0 +1,57 @@
+from django.contrib.auth import authenticate
+from django.test import TestCase
+
+from .factories import make_user
+
+PASSWORD = 'secret-pass-123'
+
+
+class EmailOrUsernameBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('Asha', email='asha@example.com')
+
+    def login(self, username, password=PASSWORD):
+        return authenticate(username=username, password=password)
+
+    def test_logs_in_with_email_in_any_case(self):
+        self.assertEqual(self.login('asha@example.com'), self.user)
+        self.assertEqual(self.login('  Asha@Example.COM '), self.user)
+
+    def test_username_is_case_insensitive(self):
+        self.assertEqual(self.login('Asha'), self.user)
+        self.assertEqual(self.login('asha'), self.user)
+
+    def test_wrong_password(self):
+        self.assertIsNone(self.login('asha@example.com', 'wrong-pass'))
+
+    def test_unknown_user_returns_none(self):
+        self.assertIsNone(self.login('nobody@example.com'))
+        self.assertIsNone(self.login('nobody'))
+
+    def test_inactive_user_cannot_log_in(self):
+        make_user('dormant', is_active=False)
+
+        self.assertIsNone(self.login('dormant'))
+        self.assertIsNone(self.login('dormant@example.com'))
+
+    def test_shared_email_matches_neither_account(self):
+        other = make_user('ravi', email='ASHA@example.com')
+
+        self.assertIsNone(self.login('asha@example.com'))
+        # Each account still signs in by username.
+        self.assertEqual(self.login('Asha'), self.user)
+        self.assertEqual(self.login('ravi'), other)
+
+    def test_exact_username_wins_over_case_folded_ones(self):
+        upper = make_user('ASHA', email='other@example.com')
+
+        self.assertEqual(self.login('ASHA'), upper)
+        self.assertEqual(self.login('Asha'), self.user)
+        self.assertIsNone(self.login('asha'))
+
+    def test_username_wins_over_another_accounts_email(self):
+        make_user('meera', email='sam@example.com')
+        sam = make_user('sam@example.com', email='sam.k@example.com')
+
+        self.assertEqual(self.login('sam@example.com'), sam)
@@ -0,0 +1,53 @@
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from properties.models import FavoriteProperty, Property
+
+from .factories import make_property, make_user
+
+
+class FavoritesBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        owner = make_user()
+        cls.listings = [make_property(owner) for _ in range(3)]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, body):
+        return self.client.post(
+            reverse('favorites-batch'), json.dumps(body), content_type='application/json', secure=True,
+        )
+
+    def test_adds_and_removes_and_moves_counters(self):
+        first, second, third = (listing.pk for listing in self.listings)
+        FavoriteProperty.objects.create(user=self.user, property_id=third)
+
+        response = self.post({'add': [first, second, first], 'remove': [third]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'favorites': sorted([first, second])})
+        counts = dict(Property.objects.values_list('pk', 'favorite_count'))
+        self.assertEqual((counts[first], counts[second], counts[third]), (1, 1, 0))
+
+    def test_adding_an_existing_favorite_leaves_its_counter_alone(self):
+        listing = self.listings[0]
+        FavoriteProperty.objects.create(user=self.user, property=listing)
+
+        response = self.post({'add': [listing.pk]})
+
+        self.assertEqual(response.json(), {'favorites': [listing.pk]})
+        listing.refresh_from_db()
+        self.assertEqual(listing.favorite_count, 1)
+
+    def test_rejects_anything_but_lists_of_integers(self):
+        digits = int(''.join(str(listing.pk) for listing in self.listings[:2]))
+        for body in ({'add': str(digits)}, {'add': [str(self.listings[0].pk)]}, {'remove': 5},
+                     {'add': [True]}, {'add': {'1': 1}}, [self.listings[0].pk]):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+        self.assertFalse(FavoriteProperty.objects.exists())
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+from django.test import TestCase
+from django.urls import reverse
+
+from properties.models import Property
+from properties.pagination import KeysetPaginator
+
+from .factories import make_property, make_user
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user()
+        listings = [make_property(owner) for _ in range(7)]
+        # One shared timestamp, so only the id tie-breaker orders the pages.
+        Property.objects.update(created_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        cls.expected = sorted(listing.pk for listing in listings)[::-1]
+
+    def paginator(self):
+        return KeysetPaginator(Property.objects.all(), 3)
+
+    def ids(self, page):
+        return [listing.pk for listing in page]
+
+    def test_walks_pages_with_equal_timestamps(self):
+        paginator = self.paginator()
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+
+        self.assertEqual([self.ids(page) for page in pages],
+                         [self.expected[:3], self.expected[3:6], self.expected[6:]])
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+    def test_previous_cursor_returns_the_earlier_page(self):
+        paginator = self.paginator()
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+
+        back = paginator.get_page(third.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertTrue(back.has_next())
+        self.assertTrue(back.has_previous())
+
+        start = paginator.get_page(back.previous_cursor)
+        self.assertEqual(self.ids(start), self.ids(first))
+        self.assertFalse(start.has_previous())
+        self.assertEqual(self.ids(paginator.get_page(start.next_cursor)), self.ids(second))
+
+    def test_garbage_cursor_falls_back_to_the_first_page(self):
+        paginator = self.paginator()
+        valid = paginator.get_page().next_cursor
+        for cursor in ('garbage', '!!!', valid[:-4], paginator.encode_cursor('sideways', Property.objects.first())):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.ids(paginator.get_page(cursor)), self.expected[:3])
+
+    def test_feed_ignores_a_garbage_cursor(self):
+        response = self.client.get(reverse('property-feed'), {'cursor': 'not-a-cursor'}, secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'])
+        self.assertIsNone(response.json()['previous'])
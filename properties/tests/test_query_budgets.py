@@ -0,0 +1,193 @@
+"""
+Per-route query budgets.
+
+Every route of ``properties/urls.py`` is requested anonymously and signed in
+against a small fixed dataset, and fails if it runs more SQL queries, or more
+repeated queries, than its entry in ``BUDGETS`` (properties/query_budgets.py)
+allows. Repeated statements are reported with the template line or code that
+ran them, so an accidental per-card query points straight at its cause.
+"""
+
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import Counter, defaultdict
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.template.base import TokenType
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from properties import urls
+from properties.models import FavoriteProperty, Property, PropertyImage, PropertyInquiry
+from properties.query_budgets import BUDGETS, ROLES
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSACTION_CONTROL = re.compile(r'(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT) ')
+
+
+class Fixture:
+    """The fixed dataset the budgets are measured against."""
+
+    def __init__(self, user):
+        self.user = user
+        owned = Property.objects.filter(owner=user, is_active=True)
+        self.listing = owned.filter(photo_count__gt=0).annotate(received=Count('inquiries')).order_by('-received').first()
+        others = Property.objects.active().exclude(owner=user).filter(photo_count__gt=0).order_by('pk')
+        self.other_listing = others.first()
+        self.inquiry = PropertyInquiry.objects.filter(property__owner=user).order_by('pk').first()
+        self.listing_ids = ','.join(str(pk) for pk in others.values_list('pk', flat=True)[:20])
+
+    @property
+    def reset_args(self):
+        # Signing in changes last_login, which invalidates earlier tokens.
+        return [urlsafe_base64_encode(force_bytes(self.user.pk)), default_token_generator.make_token(self.user)]
+
+    def new_image(self):
+        template = self.listing.images.first()
+        return PropertyImage.objects.create(property=self.listing, image=template.image.name)
+
+
+class QueryLog:
+    """execute_wrapper noting each statement, before parameters, and what triggered it."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        # The test's own transaction turns atomic blocks into savepoints; only log queries.
+        if not TRANSACTION_CONTROL.match(sql):
+            self.queries.append((sql, query_origin()))
+        return execute(sql, params, many, context)
+
+    def duplicates(self):
+        counts = Counter(sql for sql, _ in self.queries)
+        return {sql: count for sql, count in counts.items() if count > 1}
+
+
+def query_origin():
+    """The innermost template tag, or else the innermost app line, running the query."""
+    frame = sys._getframe(2)
+    app_line = None
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                markup = '{{ %s }}' if token.token_type == TokenType.VAR else '{%% %s %%}'
+                return '%s:%s %s' % (origin.template_name, token.lineno, markup % token.contents[:80])
+        filename = code.co_filename
+        if app_line is None and filename.startswith(APP_DIR) and os.sep + 'tests' + os.sep not in filename:
+            app_line = '%s:%s in %s()' % (os.path.relpath(filename, os.path.dirname(APP_DIR)), frame.f_lineno, code.co_name)
+        frame = frame.f_back
+    return app_line or 'unknown'
+
+
+@override_settings(
+    # Cache lookups are not what the budgets measure, so keep them out of the database.
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'fragments': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'fragments'},
+    },
+    METRICS_ENABLED=False,
+    REQUEST_METRICS_SAMPLE_RATE=0,
+)
+class QueryBudgetTests(TestCase):
+    """One test per route in BUDGETS, each checking both roles."""
+
+    @classmethod
+    def setUpClass(cls):
+        # The seeded listings write placeholder photos; keep them out of MEDIA_ROOT.
+        media_root = tempfile.mkdtemp(prefix='query-budgets-')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        # Anonymous 403s and 404s are expected; don't log them.
+        request_logger = logging.getLogger('django.request')
+        cls.addClassCleanup(request_logger.setLevel, request_logger.level)
+        request_logger.setLevel(logging.ERROR)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        quiet = StringIO()
+        call_command('seed_synthetic', listings=80, users=8, seed=1, stdout=quiet)
+        call_command('rebuild_similar_properties', stdout=quiet)
+        owner_id = (
+            Property.objects.values('owner').annotate(listings=Count('id')).order_by('-listings', 'owner')
+            .values_list('owner', flat=True).first()
+        )
+        user = User.objects.get(pk=owner_id)
+        user.is_staff = True
+        user.save(update_fields=['is_staff'])
+        # Make sure every signed-in page has a full page of cards or rows.
+        for listing in Property.objects.active().exclude(owner=user).order_by('-pk')[:16]:
+            FavoriteProperty.objects.get_or_create(user=user, property=listing)
+            PropertyInquiry.objects.get_or_create(property=listing, sender=user, defaults={
+                'name': 'Budget', 'email': 'budget@example.com', 'phone': '5550100', 'message': 'Still available?',
+            })
+        cls.fixture = Fixture(user)
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns if pattern.name}
+        self.assertEqual(sorted(names - set(BUDGETS)), [], 'Routes without an entry in BUDGETS.')
+
+    def assertWithinBudget(self, name, role):
+        method, build_url, budgets = BUDGETS[name]
+        max_queries, max_duplicates = budgets[role]
+        if role == 'user':
+            self.client.force_login(self.fixture.user)
+        url = build_url(self.fixture)
+        for backend in caches.all():
+            backend.clear()
+
+        log = QueryLog()
+        with CaptureQueriesContext(connection) as captured, connection.execute_wrapper(log):
+            response = getattr(self.client, method.lower())(url, secure=True)
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+        queries = [query['sql'] for query in captured.captured_queries if not TRANSACTION_CONTROL.match(query['sql'])]
+        duplicates = log.duplicates()
+        duplicate_count = sum(count - 1 for count in duplicates.values())
+        if len(queries) <= max_queries and duplicate_count <= max_duplicates:
+            return
+        origins = defaultdict(Counter)
+        for sql, origin in log.queries:
+            origins[sql][origin] += 1
+        lines = [
+            f'{name} ({role}, {response.status_code}) ran {len(queries)} queries (budget {max_queries}) '
+            f'with {duplicate_count} duplicates (budget {max_duplicates}).'
+        ]
+        for sql, count in sorted(duplicates.items(), key=lambda item: -item[1]):
+            lines.append(f'    {count}x {sql[:400]}')
+            for origin, times in origins[sql].most_common(3):
+                lines.append(f'       {times}x from {origin}')
+        if not duplicates:
+            lines.extend(f'    {sql[:200]}' for sql in queries)
+        self.fail('\n'.join(lines))
+
+
+def _budget_test(name):
+    def test(self):
+        for role in ROLES:
+            with self.subTest(role=role):
+                self.assertWithinBudget(name, role)
+    test.__doc__ = f'{name} stays within its query budget.'
+    return test
+
+
+for _name in BUDGETS:
+    setattr(QueryBudgetTests, 'test_' + _name.replace('-', '_'), _budget_test(_name))
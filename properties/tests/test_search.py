@@ -0,0 +1,53 @@
+from django.db.models import Count
+from django.test import TestCase
+from django.urls import reverse
+
+from properties import search
+from properties.models import Property
+from properties.pagination import KeysetPaginator
+
+from .factories import make_property, make_user
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user()
+        cls.title_match = make_property(owner, title='Garden villa', city='Goa')
+        cls.text_match = make_property(owner, title='Quiet flat', description='Shared garden and gym.')
+        cls.other = make_property(owner, title='Studio', description='Near the station.')
+        for index in range(3):
+            make_property(owner, title=f'Garden flat {index}', city='Pune')
+
+    def search(self, query, rank=True):
+        return search.search_properties(Property.objects.all(), query, rank=rank)
+
+    def test_matches_every_term_as_a_prefix(self):
+        self.assertEqual(set(self.search('gard vill')), {self.title_match})
+        self.assertNotIn(self.other, self.search('garden'))
+
+    def test_title_matches_rank_first(self):
+        ranked = list(self.search('garden').order_by('-search_rank', '-id'))
+
+        self.assertEqual(len(ranked), 5)
+        self.assertEqual(ranked[-1], self.text_match)
+
+    def test_composes_with_count_values_and_keyset_pages(self):
+        self.assertEqual(self.search('garden', rank=False).count(), 5)
+        cities = dict(self.search('garden', rank=False).values_list('city').annotate(n=Count('id')))
+        self.assertEqual(cities, {'Goa': 1, 'Pune': 4})
+
+        paginator = KeysetPaginator(self.search('garden'), 2, keys=('search_rank', 'created_at', 'id'))
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        seen = [listing.pk for page in pages for listing in page]
+        expected = self.search('garden').order_by('-search_rank', '-created_at', '-id').values_list('pk', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_listing_page_searches(self):
+        response = self.client.get(reverse('property-list'), {'search': 'villa'}, secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page_obj']), [self.title_match])
+        self.assertEqual(int(response.context['total_count']), 1)
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from properties.models import SLUG_ATTEMPTS, Property
+from properties.slugs import allocate_slugs, next_free_slug
+
+from .factories import make_property, make_user
+
+
+class SlugAllocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user()
+
+    def test_next_free_slug_counts_up_from_the_base(self):
+        slugs = []
+        for _ in range(3):
+            slugs.append(next_free_slug(Property.objects.all(), 'sea-view'))
+            make_property(self.owner, title='Sea View', slug=slugs[-1])
+
+        self.assertEqual(slugs, ['sea-view', 'sea-view-1', 'sea-view-2'])
+
+    def test_next_free_slug_follows_the_numerically_largest_suffix(self):
+        for slug in ('flat', 'flat-2', 'flat-10', 'flat-9'):
+            make_property(self.owner, title='Flat', slug=slug)
+
+        self.assertEqual(next_free_slug(Property.objects.all(), 'flat'), 'flat-11')
+
+    def test_base_ending_in_a_number_is_its_own_family(self):
+        make_property(self.owner, title='Tower', slug='tower')
+        make_property(self.owner, title='Tower', slug='tower-2')
+
+        self.assertEqual(next_free_slug(Property.objects.all(), 'tower-2'), 'tower-2-1')
+        self.assertEqual(next_free_slug(Property.objects.all(), 'tower'), 'tower-3')
+
+    def test_save_allocates_in_sequence(self):
+        slugs = [make_property(self.owner, title='Garden House').slug for _ in range(3)]
+
+        self.assertEqual(slugs, ['garden-house', 'garden-house-1', 'garden-house-2'])
+
+    def test_allocate_slugs_numbers_a_batch_after_existing_rows(self):
+        make_property(self.owner, title='Loft', slug='loft')
+        make_property(self.owner, title='Plot 7', slug='plot-7')
+
+        slugs = allocate_slugs(Property.objects.all(), ['Loft', 'Plot 7', 'Loft', 'Plot', 'Plot 7'])
+
+        # "plot-7" also reads as member 7 of the "plot" family, as it does for next_free_slug.
+        self.assertEqual(slugs, ['loft-1', 'plot-7-1', 'loft-2', 'plot-8', 'plot-7-2'])
+        self.assertEqual(next_free_slug(Property.objects.all(), 'plot'), 'plot-8')
+
+    def test_allocate_slugs_starts_new_titles_at_the_base(self):
+        self.assertEqual(allocate_slugs(Property.objects.all(), ['Villa', 'Villa', 'Villa']),
+                         ['villa', 'villa-1', 'villa-2'])
+
+    def test_save_falls_back_to_a_random_slug_when_every_candidate_is_taken(self):
+        make_property(self.owner, title='Penthouse')
+        # Simulate a concurrent writer that always claims the allocated slug first.
+        with mock.patch('properties.models.next_free_slug', return_value='penthouse') as allocate:
+            listing = make_property(self.owner, title='Penthouse')
+
+        self.assertEqual(allocate.call_count, SLUG_ATTEMPTS - 1)
+        self.assertRegex(listing.slug, r'^penthouse-[0-9a-f]{8}$')
+        self.assertEqual(Property.objects.filter(slug__startswith='penthouse').count(), 2)
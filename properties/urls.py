@@ -1,11 +1,13 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Home and listing
     path('', views.home, name='home'),
     path('properties/', views.property_list, name='property-list'),
+    path('properties/feed/', views.property_feed, name='property-feed'),
+    path('properties/map/', views.property_map, name='property-map'),
     path('property/<slug:slug>/', views.property_detail, name='property-detail'),
     
     # Authentication
@@ -43,8 +45,22 @@ urlpatterns = [
     # Favorites
     path('saved-properties/', views.saved_properties, name='saved-properties'),
     path('toggle-favorite/<slug:slug>/', views.toggle_favorite, name='toggle-favorite'),
+    path('favorites/batch/', views.favorites_batch, name='favorites-batch'),
+    
+    # Exports
+    path('export/properties/', views.export_properties, name='export-properties'),
+    path('export/inquiries/', views.export_inquiries, name='export-inquiries'),
+    
+    # Read-only JSON API
+    path('api/v1/listings/', api.listings, name='api-listings'),
+    path('api/v1/listings/<slug:slug>/', api.listing_detail, name='api-listing-detail'),
+    path('api/v1/listings/<slug:slug>/images/', api.listing_images, name='api-listing-images'),
+    path('api/v1/facets/', api.facets, name='api-facets'),
     
     # Dashboard and Profile
     path('dashboard/', views.dashboard, name='dashboard'),
     path('profile/', views.profile, name='profile'),
+    
+    # Prometheus metrics (see metrics.py)
+    path('metrics', views.metrics_view, name='metrics'),
 ]
@@ -1,17 +1,29 @@
+import json
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
 from django.contrib import messages
-from django.db.models import Q
-from django.core.paginator import Paginator
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from .models import Property, PropertyImage, PropertyInquiry, FavoriteProperty
 from .forms import (
     SignUpForm, LoginForm, PropertyForm, PropertyInquiryForm,
     PropertySearchForm, PropertyImageForm, CustomPasswordResetForm
 )
+from . import conditional, favorites, geo, jobs, metrics
+from .caching import cached_listings
+from .counts import listing_count
+from .exports import INQUIRY_EXPORT_FIELDS, PROPERTY_EXPORT_FIELDS, export_response
+from .facets import listing_facets
+from .filters import filter_properties, ordering_keys, record_filters
+from .pagination import KeysetPaginator
 
 
 # ============ Authentication Views ============
@@ -44,14 +56,8 @@ def login_view(request):
             username_or_email = form.cleaned_data['username']
             password = form.cleaned_data['password']
             
-            # Try to authenticate with username first, then email
+            # EmailOrUsernameBackend accepts either
             user = authenticate(request, username=username_or_email, password=password)
-            if not user:
-                try:
-                    user_obj = User.objects.get(email=username_or_email)
-                    user = authenticate(request, username=user_obj.username, password=password)
-                except User.DoesNotExist:
-                    pass
             
             if user:
                 login(request, user)
@@ -77,108 +83,105 @@ def logout_view(request):
 # ============ Home & Listing Views ============
 
 def home(request):
-    featured_properties = Property.objects.filter(is_active=True, is_featured=True)[:6]
-    latest_properties = Property.objects.filter(is_active=True)[:12]
+    cards = Property.objects.active().for_cards().order_by('-created_at')
+    featured_properties = cached_listings('home-featured', lambda: list(cards.filter(is_featured=True)[:6]))
+    latest_properties = cached_listings('home-latest', lambda: list(cards[:12]))
     
     context = {
         'featured_properties': featured_properties,
         'latest_properties': latest_properties,
         'listing_types': Property.LISTING_TYPE_CHOICES,
+        'user_favorites': favorites.favorite_ids(
+            request.user, [p.id for p in featured_properties + latest_properties]
+        ),
     }
     return render(request, 'properties/home.html', context)
 
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.listing_etag)
 def property_list(request):
-    properties = Property.objects.filter(is_active=True)
     form = PropertySearchForm(request.GET)
-    
-    # Apply filters
-    search_query = request.GET.get('search', '')
-    if search_query:
-        properties = properties.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(location__icontains=search_query) |
-            Q(city__icontains=search_query)
-        )
-    
-    listing_type = request.GET.get('listing_type', '')
-    if listing_type:
-        properties = properties.filter(listing_type=listing_type)
-    
-    property_type = request.GET.get('property_type', '')
-    if property_type:
-        properties = properties.filter(property_type=property_type)
-    
-    city = request.GET.get('city', '')
-    if city:
-        properties = properties.filter(city__icontains=city)
-    
-    min_price = request.GET.get('min_price')
-    if min_price:
-        try:
-            min_price = float(min_price)
-            properties = properties.filter(price__gte=min_price)
-        except (ValueError, TypeError):
-            pass
-    
-    max_price = request.GET.get('max_price')
-    if max_price:
-        try:
-            max_price = float(max_price)
-            properties = properties.filter(price__lte=max_price)
-        except (ValueError, TypeError):
-            pass
-    
-    bedrooms = request.GET.get('bedrooms')
-    if bedrooms:
-        try:
-            bedrooms = int(bedrooms)
-            properties = properties.filter(bedrooms__gte=bedrooms)
-        except (ValueError, TypeError):
-            pass
-    
-    bathrooms = request.GET.get('bathrooms')
-    if bathrooms:
-        try:
-            bathrooms = int(bathrooms)
-            properties = properties.filter(bathrooms__gte=bathrooms)
-        except (ValueError, TypeError):
-            pass
-    
-    is_furnished = request.GET.get('is_furnished')
-    if is_furnished:
-        properties = properties.filter(is_furnished=True)
-    
-    has_parking = request.GET.get('has_parking')
-    if has_parking:
-        properties = properties.filter(has_parking=True)
+    properties = filter_properties(Property.objects.active(), request.GET)
+    record_filters(request.GET)
     
     # Pagination
-    paginator = Paginator(properties.order_by('-created_at'), 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Get user favorites if logged in
-    user_favorites = set()
-    if request.user.is_authenticated:
-        user_favorites = set(
-            request.user.favorite_properties.values_list('property_id', flat=True)
-        )
+    page_obj = _paginate_listings(properties, request.GET.get('cursor'))
     
     context = {
         'page_obj': page_obj,
         'form': form,
-        'user_favorites': user_favorites,
-        'total_count': properties.count(),
+        'user_favorites': favorites.favorite_ids(request.user, [p.id for p in page_obj]),
+        'total_count': listing_count(
+            filter_properties(Property.objects.active(), request.GET, rank=False), request.GET
+        ),
+        'facets': listing_facets(Property.objects.active(), request.GET),
     }
     return render(request, 'properties/property_list.html', context)
 
 
+def property_feed(request):
+    properties = filter_properties(Property.objects.active(), request.GET)
+    record_filters(request.GET)
+    page = _paginate_listings(properties, request.GET.get('cursor'))
+    
+    return JsonResponse({
+        'results': [_property_card_data(property_obj) for property_obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+        'facets': listing_facets(Property.objects.active(), request.GET),
+    })
+
+
+def property_map(request):
+    properties = filter_properties(Property.objects.active(), request.GET, rank=False).filter(
+        latitude__isnull=False, longitude__isnull=False
+    )
+    fields = ['id', 'slug', 'title', 'price', 'listing_type', 'latitude', 'longitude']
+    point = geo.parse_point(request.GET)
+    if point:
+        # Nearest first before truncating, so these are the closest 500 overall.
+        properties = properties.annotate(distance_km=geo.distance_km(point[0], point[1])).order_by('distance_km', 'id')
+        fields.append('distance_km')
+    markers = list(properties.values(*fields)[:500])
+    
+    for marker in markers:
+        marker['price'] = str(marker['price'])
+        if 'distance_km' in marker:
+            marker['distance_km'] = round(marker['distance_km'], 3)
+    return JsonResponse({'results': markers})
+
+
+def _paginate_listings(properties, cursor):
+    paginator = KeysetPaginator(properties.for_cards(), settings.PROPERTIES_PER_PAGE, keys=ordering_keys(properties))
+    return paginator.get_page(cursor)
+
+
+def _property_card_data(property_obj):
+    primary_image = property_obj.primary_image
+    return {
+        'id': property_obj.id,
+        'slug': property_obj.slug,
+        'url': property_obj.get_absolute_url(),
+        'title': property_obj.title,
+        'listing_type': property_obj.listing_type,
+        'property_type': property_obj.property_type,
+        'city': property_obj.city,
+        'state': property_obj.state,
+        'price': str(property_obj.price),
+        'bedrooms': property_obj.bedrooms,
+        'bathrooms': property_obj.bathrooms,
+        'area': property_obj.area,
+        'image': primary_image.image.url if primary_image else None,
+        'image_count': property_obj.image_count,
+    }
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.detail_etag, last_modified_func=conditional.detail_last_modified)
 def property_detail(request, slug):
-    property_obj = get_object_or_404(Property, slug=slug)
+    property_obj = get_object_or_404(Property.objects.select_related('owner'), slug=slug)
     images = property_obj.images.all()
-    inquiries_count = property_obj.inquiries.filter(status='pending').count()
     
     is_favorite = False
     if request.user.is_authenticated:
@@ -186,18 +189,24 @@ def property_detail(request, slug):
             user=request.user, property=property_obj
         ).exists()
     
-    similar_properties = Property.objects.filter(
-        is_active=True,
-        city=property_obj.city,
-        property_type=property_obj.property_type,
-    ).exclude(id=property_obj.id)[:4]
+    similar_properties = list(Property.objects.active().for_cards().filter(
+        neighbour_of__property=property_obj
+    ).order_by('neighbour_of__rank')[:4])
+    if not similar_properties:
+        # Neighbours are not computed yet for brand new listings.
+        similar_properties = Property.objects.for_cards().filter(
+            is_active=True,
+            city=property_obj.city,
+            property_type=property_obj.property_type,
+        ).exclude(id=property_obj.id).order_by('-created_at')[:4]
     
     context = {
         'property': property_obj,
         'images': images,
         'is_favorite': is_favorite,
         'similar_properties': similar_properties,
-        'inquiries_count': inquiries_count,
+        'inquiries_count': property_obj.pending_inquiry_count,
+        'processing_photos': jobs.pending_image_count(property_obj),
     }
     return render(request, 'properties/property_detail.html', context)
 
@@ -213,15 +222,8 @@ def post_property(request):
             property_obj.owner = request.user
             property_obj.save()
             
-            # Handle multiple image uploads
-            images = request.FILES.getlist('images')
-            for index, image in enumerate(images):
-                is_primary = index == 0  # First image is primary
-                PropertyImage.objects.create(
-                    property=property_obj,
-                    image=image,
-                    is_primary=is_primary
-                )
+            # Images are stored by the process_jobs worker; first one is primary
+            jobs.enqueue_image_uploads(property_obj, request.FILES.getlist('images'), first_is_primary=True)
             
             messages.success(request, 'Property posted successfully!')
             return redirect('property-detail', slug=property_obj.slug)
@@ -245,14 +247,8 @@ def edit_property(request, slug):
         if form.is_valid():
             property_obj = form.save()
             
-            # Handle new image uploads
-            images = request.FILES.getlist('images')
-            for index, image in enumerate(images):
-                PropertyImage.objects.create(
-                    property=property_obj,
-                    image=image,
-                    is_primary=False
-                )
+            # New images are stored by the process_jobs worker
+            jobs.enqueue_image_uploads(property_obj, request.FILES.getlist('images'))
             
             messages.success(request, 'Property updated successfully!')
             return redirect('property-detail', slug=property_obj.slug)
@@ -268,6 +264,7 @@ def edit_property(request, slug):
         'property': property_obj,
         'action': 'Edit',
         'images': property_obj.images.all(),
+        'processing_photos': jobs.pending_image_count(property_obj),
     }
     return render(request, 'properties/edit_property.html', context)
 
@@ -343,36 +340,59 @@ def dashboard(request):
     ).select_related('sender', 'property').order_by('-created_at')
     recent_inquiries = all_inquiries[:10]
     
-    stats = {
-        'total_properties': user_properties.count(),
-        'active_properties': user_properties.filter(is_active=True).count(),
-        'total_inquiries': all_inquiries.count(),
-        'pending_inquiries': all_inquiries.filter(status='pending').count(),
-    }
+    # One conditional-aggregate query per model
+    stats = user_properties.aggregate(
+        total_properties=Count('id'),
+        active_properties=Count('id', filter=Q(is_active=True)),
+    )
+    stats.update(PropertyInquiry.objects.filter(property__owner=request.user).aggregate(
+        total_inquiries=Count('id'),
+        pending_inquiries=Count('id', filter=Q(status='pending')),
+    ))
+    
+    # Favorites are a counter column; the inquiry total is a correlated
+    # subquery, evaluated only for the rows on this page.
+    property_rows = user_properties.annotate(inquiry_count=_related_count(PropertyInquiry))
+    paginator = KeysetPaginator(property_rows, 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {
-        'user_properties': user_properties,
+        'page_obj': page_obj,
         'recent_inquiries': recent_inquiries,
         'stats': stats,
     }
     return render(request, 'properties/dashboard.html', context)
 
 
+def _related_count(model):
+    rows = model.objects.filter(property=OuterRef('pk')).order_by().values('property')
+    return Coalesce(Subquery(rows.annotate(total=Count('id')).values('total')), 0)
+
+
 @login_required(login_url='login')
 def manage_inquiries(request):
-    inquiries = PropertyInquiry.objects.filter(
-        property__owner=request.user
-    ).select_related('sender', 'property').order_by('-created_at')
+    inquiries = _received_inquiries(request).select_related('sender', 'property')
     
     # Pagination
-    paginator = Paginator(inquiries, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(inquiries, 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
-    context = {'page_obj': page_obj}
+    context = {
+        'page_obj': page_obj,
+        'status': request.GET.get('status', ''),
+        'status_choices': PropertyInquiry.STATUS_CHOICES,
+    }
     return render(request, 'properties/manage_inquiries.html', context)
 
 
+def _received_inquiries(request):
+    inquiries = PropertyInquiry.objects.filter(property__owner=request.user)
+    status = request.GET.get('status', '')
+    if status in dict(PropertyInquiry.STATUS_CHOICES):
+        inquiries = inquiries.filter(status=status)
+    return inquiries
+
+
 @login_required(login_url='login')
 def inquiry_detail(request, inquiry_id):
     inquiry = get_object_or_404(PropertyInquiry, id=inquiry_id, property__owner=request.user)
@@ -393,29 +413,42 @@ def inquiry_detail(request, inquiry_id):
 def my_inquiries(request):
     inquiries = PropertyInquiry.objects.filter(sender=request.user).select_related(
         'property', 'property__owner'
-    ).order_by('-created_at')
+    )
     
     # Pagination
-    paginator = Paginator(inquiries, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(inquiries, 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {'page_obj': page_obj}
     return render(request, 'properties/my_inquiries.html', context)
 
 
+# ============ Export Views ============
+
+@login_required(login_url='login')
+def export_properties(request):
+    properties = filter_properties(request.user.properties.all(), request.GET)
+    return export_response(properties, PROPERTY_EXPORT_FIELDS, request.GET.get('format'), 'properties')
+
+
+@login_required(login_url='login')
+def export_inquiries(request):
+    inquiries = _received_inquiries(request).order_by('-created_at')
+    return export_response(inquiries, INQUIRY_EXPORT_FIELDS, request.GET.get('format'), 'inquiries')
+
+
 # ============ Favorites Views ============
 
 @login_required(login_url='login')
 def saved_properties(request):
-    favorites = FavoriteProperty.objects.filter(user=request.user).select_related(
-        'property'
-    ).order_by('-added_at')
+    # Cards need for_cards(); the favorite's own columns keep the newest-saved order.
+    saved = Property.objects.for_cards().filter(favorited_by__user=request.user).annotate(
+        added_at=F('favorited_by__added_at'), favorite_id=F('favorited_by__id'),
+    )
     
     # Pagination
-    paginator = Paginator(favorites, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(saved, 12, keys=('added_at', 'favorite_id'))
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {'page_obj': page_obj}
     return render(request, 'properties/saved_properties.html', context)
@@ -424,17 +457,42 @@ def saved_properties(request):
 @login_required(login_url='login')
 @require_http_methods(["POST"])
 def toggle_favorite(request, slug):
-    property_obj = get_object_or_404(Property, slug=slug)
-    favorite, created = FavoriteProperty.objects.get_or_create(
-        user=request.user,
-        property=property_obj
-    )
-    
-    if not created:
-        favorite.delete()
-        return JsonResponse({'status': 'removed', 'is_favorite': False})
-    
-    return JsonResponse({'status': 'added', 'is_favorite': True})
+    is_favorite = favorites.toggle(request.user, slug)
+    if is_favorite is None:
+        return JsonResponse({'error': 'Property not found'}, status=404)
+    return JsonResponse({'status': 'added' if is_favorite else 'removed', 'is_favorite': is_favorite})
+
+
+@login_required(login_url='login')
+@require_http_methods(["GET", "POST"])
+def favorites_batch(request):
+    """
+    GET ?ids=1,2,3 returns which of those listings are favorites; POST a
+    JSON body {"add": [ids], "remove": [ids]} to change many at once.
+    """
+    try:
+        if request.method == 'GET':
+            add, remove = [int(value) for value in request.GET.get('ids', '').split(',') if value.strip()], []
+        else:
+            body = json.loads(request.body or '{}')
+            add, remove = _id_list(body.get('add', [])), _id_list(body.get('remove', []))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Expected lists of listing ids'}, status=400)
+    if len(add) + len(remove) > favorites.MAX_BATCH_SIZE:
+        return JsonResponse({'error': f'At most {favorites.MAX_BATCH_SIZE} ids per request'}, status=400)
+    
+    if request.method == 'GET':
+        favorite = favorites.favorite_ids(request.user, add)
+    else:
+        favorite = favorites.update(request.user, add, remove)
+    return JsonResponse({'favorites': sorted(favorite)})
+
+
+def _id_list(values):
+    # A JSON list of integers and nothing else: iterating a string would turn "12" into ids 1 and 2.
+    if not isinstance(values, list) or not all(type(value) is int for value in values):
+        raise ValueError('Expected a list of listing ids')
+    return values
 
 
 # ============ Profile Views ============
@@ -457,6 +515,18 @@ def profile(request):
     return render(request, 'properties/profile.html', context)
 
 
+# ============ Metrics ============
+
+def metrics_view(request):
+    """Prometheus text exposition; staff only, or a scraper with METRICS_TOKEN."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    scraper = bool(token) and constant_time_compare(authorization, 'Bearer ' + token)
+    if not (scraper or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ============ Error Views ============
 
 def error_404(request, exception):
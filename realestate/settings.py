@@ -4,6 +4,7 @@ Django settings for realestate project.
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -32,6 +33,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'properties.middleware.MetricsMiddleware',
+    'properties.middleware.RequestTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -44,9 +47,9 @@ ROOT_URLCONF = 'realestate.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Stock Django templates, plus render timing for RequestTimingMiddleware
+        'BACKEND': 'properties.instrumentation.DjangoTemplates',
         'DIRS': [BASE_DIR / 'properties' / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -54,10 +57,21 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compile each template once per process, whatever DEBUG says; the
+            # development server's autoreloader clears it when a template changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Compile the project's templates when a WSGI worker boots (see properties/templates_warmup.py)
+TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', 'True') == 'True'
+
 WSGI_APPLICATION = 'realestate.wsgi.application'
 
 # Database
@@ -68,6 +82,44 @@ DATABASES = {
     }
 }
 
+# Cache - shared by every web and worker process on every host, so the
+# listings-version bumps fired by signals.py reach all of them: Redis when
+# REDIS_URL is set, otherwise a table in the database (created by migration
+# 0011_cache_table). Listing-card fragments are keyed on the listing's
+# updated_at and never need invalidating, so each process keeps its own in
+# memory instead of writing one shared entry per card.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'TIMEOUT': 3600,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'realestate_cache',
+            'TIMEOUT': 3600,
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+            },
+        }
+    }
+CACHES['fragments'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'TIMEOUT': 86400,
+    'OPTIONS': {
+        'MAX_ENTRIES': 5000,
+    },
+}
+
+# Log in with a username or email address (see properties/backends.py)
+AUTHENTICATION_BACKENDS = [
+    'properties.backends.EmailOrUsernameBackend',
+]
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -137,6 +189,90 @@ LOGOUT_REDIRECT_URL = 'home'
 # Pagination
 PROPERTIES_PER_PAGE = 12
 
+# Listing result counts: totals above the cap render as "1,000+"; approximate
+# counts use planner statistics for large unfiltered result sets.
+PROPERTY_COUNT_CAP = 1000
+PROPERTY_COUNT_CACHE_TIMEOUT = 300
+PROPERTY_APPROXIMATE_COUNTS = os.environ.get('PROPERTY_APPROXIMATE_COUNTS', 'False') == 'True'
+PROPERTY_APPROXIMATE_COUNT_THRESHOLD = 100000
+
+# Home page sections and listing card fragments
+HOME_SECTIONS_CACHE_TIMEOUT = 600
+
+# Record applied listing filters (one JSON object per line) for
+# `manage.py explain_filters`; off unless a path is given.
+PROPERTY_FILTER_LOG = os.environ.get('PROPERTY_FILTER_LOG', '')
+
+# Request timing (see properties/middleware.py): a JSON log line per sampled
+# request on the properties.performance logger, plus a Server-Timing header.
+# The header exposes query counts and timings, so it is on only in DEBUG.
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', '0.1'))
+REQUEST_METRICS_SERVER_TIMING = os.environ.get('REQUEST_METRICS_SERVER_TIMING', str(DEBUG)) == 'True'
+REQUEST_METRICS_DUPLICATE_WARNING = 5
+REQUEST_METRICS_LOG_LEVEL = os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'INFO')
+
+# Per-route metrics (see properties/metrics.py), served at /metrics to staff
+# or to a scraper sending "Authorization: Bearer $METRICS_TOKEN". Worker
+# snapshots are shared through METRICS_DIR, which must be local to the host.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'realestate-metrics'))
+METRICS_FLUSH_INTERVAL = 5  # seconds between a worker's snapshots
+METRICS_RETENTION = 86400  # drop snapshots of workers idle or gone this long
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'performance': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+    'loggers': {
+        'properties.performance': {
+            'handlers': ['performance'], 'level': REQUEST_METRICS_LOG_LEVEL, 'propagate': False,
+        },
+    },
+}
+if PROPERTY_FILTER_LOG:
+    LOGGING['handlers']['filter_log'] = {
+        'class': 'logging.FileHandler',
+        'filename': PROPERTY_FILTER_LOG,
+        'formatter': 'message',
+    }
+    LOGGING['loggers']['properties.filters'] = {
+        'handlers': ['filter_log'], 'level': 'INFO', 'propagate': False,
+    }
+
+# Price bands (lower edges) for the listing price facet
+PROPERTY_PRICE_BANDS = (0, 10_000, 50_000, 250_000, 1_000_000, 5_000_000, 20_000_000)
+
+# Precomputed similar listings (see properties/recommendations.py)
+SIMILAR_PROPERTIES_COUNT = 8
+SIMILAR_PROPERTIES_REFRESH_ON_SAVE = True  # queued as a background job
+# Incremental refreshes compare a listing with others of its type in the same
+# city or within this radius, at most this many
+SIMILAR_PROPERTIES_RADIUS_KM = 25
+SIMILAR_PROPERTIES_MAX_CANDIDATES = 5000
+# Memory for one block of the full rebuild's distance matrix
+SIMILAR_PROPERTIES_BLOCK_BYTES = 64 * 1024 * 1024
+
+# Responsive image derivatives (see properties/images.py)
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+IMAGE_DERIVATIVE_WORKERS = 2
+IMAGE_DERIVATIVES_ON_UPLOAD = True
+
+# Background jobs (see properties/jobs.py), run by `manage.py process_jobs`
+JOB_MAX_ATTEMPTS = 5
+JOB_LOCK_TIMEOUT = 600  # seconds before a running job is considered abandoned
+JOB_POLL_INTERVAL = 2
+# Uploaded photos wait here for the worker. It must be a local path the
+# worker can read: the web process writes it, the worker empties it.
+UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'realestate-uploads'))
+
 # Session settings
 SESSION_COOKIE_AGE = 1209600  # 2 weeks
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
@@ -4,8 +4,14 @@ WSGI config for realestate project.
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestate.settings')
 
 application = get_wsgi_application()
+
+if settings.TEMPLATE_WARMUP:
+    from properties.templates_warmup import warm_templates
+
+    warm_templates()